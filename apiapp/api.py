@@ -1,13 +1,16 @@
+import json
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import django
 from django.conf import settings
-from fastapi import FastAPI, HTTPException, Query
-from typing import List
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from django.utils.http import http_date, parse_http_date_safe
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Literal, Optional
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection
 from pydantic import BaseModel
-from webapp.models import Recipe as DjangoRecipe
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,29 +19,39 @@ logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
-# Настройка проекта Django
+# Настройка проекта Django (настройки медиафайлов и разбор ингредиентов)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "recipe_website.settings")
 django.setup()
 
-# Создаем экземпляр FastAPI
-app = FastAPI()
+from webapp.models import FALLBACK_IMAGE_FORMAT, THUMBNAIL_IMAGE_WIDTH  # noqa: E402
+from webapp.ingredients import normalize_ingredient  # noqa: E402
+from webapp.search import FUZZY_INDEXES, SEARCH_CONFIG  # noqa: E402
+from webapp.pagination import decode_cursor, encode_cursor  # noqa: E402
+from webapp.conditional import make_etag  # noqa: E402
+from apiapp import db  # noqa: E402
+
+"""
+Асинхронный API рецептов. Все запросы к БД выполняются через общий ограниченный пул соединений
+(apiapp/db.py) и не блокируют цикл событий. Запуск: uvicorn apiapp.api:app --workers <число процессов>
+"""
+
 
-# Подключение к базе данных проекта
-DATABASE_URL = f"postgresql://{os.getenv('DATABASE_USER')}:{os.getenv('DATABASE_PASSWORD')}@" \
-               f"{os.getenv('DATABASE_HOST')}:{os.getenv('DATABASE_PORT')}/{os.getenv('DATABASE_NAME')}"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Закрытие соединений пула при остановке процесса
+    await db.engine.dispose()
 
-try:
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-except Exception as e:
-    logger.error(f"Error connecting to the database: {str(e)}")
-    raise HTTPException(status_code=500, detail="Internal Server Error: Unable to connect to the database")
+
+# Создаем экземпляр FastAPI
+app = FastAPI(lifespan=lifespan)
 
 
 class Recipe(BaseModel):
     """
     Pydantic-модель Recipe для FastAPI
     """
+    id: int
     title: str
     category: str
     description: str
@@ -46,60 +59,347 @@ class Recipe(BaseModel):
     cooking_steps: str
     cooking_time: int
     image: str
-    image_thumbnail: str
+    image_thumbnail: Optional[str] = None
     author: str
     active: bool
     created_date: str
 
 
-@app.get("/recipes/{recipe_name}", response_model=Recipe)
-def read_recipe_by_name(recipe_name: str):
+class RecipeList(BaseModel):
+    """
+    Список рецептов с выбранными полями (параметр fields) и курсором следующей страницы
+    """
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+# Поля ответа API и столбцы запроса, из которых они получаются
+RECIPE_FIELDS = {
+    'id': db.Recipe.id,
+    'title': db.Recipe.title,
+    'category': db.Category.name.label('category'),
+    'description': db.Recipe.description,
+    'ingredients': db.Recipe.ingredients,
+    'cooking_steps': db.Recipe.cooking_steps,
+    'cooking_time': db.Recipe.cooking_time,
+    'image': db.Recipe.image,
+    'image_thumbnail': db.Recipe.image_variants,
+    'author': db.User.username.label('author'),
+    'active': db.Recipe.active,
+    'created_date': db.Recipe.created_date,
+}
+
+# Максимальное количество рецептов в одном ответе
+MAX_LIMIT = 100
+
+
+def select_recipes(fields=tuple(RECIPE_FIELDS)):
+    """
+    Запрос рецептов только с нужными столбцами, категория и автор присоединяются,
+    если их поля запрошены
+    """
+    columns = {RECIPE_FIELDS[field] for field in fields} | {db.Recipe.id, db.Recipe.created_date}
+    query = select(*sorted(columns, key=lambda column: column.key))
+    if 'category' in fields:
+        query = query.join(db.Category, db.Recipe.category_id == db.Category.id)
+    if 'author' in fields:
+        query = query.join(db.User, db.Recipe.author_id == db.User.id)
+    return query
+
+
+def parse_fields(fields: Optional[str]):
+    """
+    Список полей из параметра fields (через запятую), по умолчанию - все поля рецепта
+    """
+    if not fields:
+        return tuple(RECIPE_FIELDS)
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in names if name not in RECIPE_FIELDS]
+    if unknown or not names:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def is_postgresql(connection: AsyncConnection):
+    return connection.dialect.name == 'postgresql'
+
+
+def thumbnail_url(row):
+    """
+    Адрес миниатюры из уменьшенных копий, созданных при обработке изображения
+    (None, пока изображение не обработано)
+    """
+    name = (row.image_variants or {}).get(FALLBACK_IMAGE_FORMAT, {}).get(str(THUMBNAIL_IMAGE_WIDTH))
+    return settings.MEDIA_URL + name if name else None
+
+
+async def serialize_rows(rows, fields=tuple(RECIPE_FIELDS)) -> List[Dict[str, Any]]:
     """
-    Маршрут FastAPI для чтения рецепта по названию (регистр названия рецепта не важен, при этом ищет рецепты,
-    содержащие заданное название, а не только начинающиеся с него)
+    Преобразование строк результата запроса в словари с запрошенными полями рецепта
     """
-    with SessionLocal() as db_session:
-        recipe = db_session.query(DjangoRecipe).filter(DjangoRecipe.title.ilike(f"%{recipe_name}%")).first()
+    converters = {
+        'cooking_time': lambda row: int(row.cooking_time.total_seconds() // 60),
+        'image': lambda row: settings.MEDIA_URL + row.image,
+        'image_thumbnail': thumbnail_url,
+        'created_date': lambda row: row.created_date.isoformat(),
+    }
+    return [
+        {field: converters[field](row) if field in converters else getattr(row, field) for field in fields}
+        for row in rows
+    ]
 
-        if recipe is None:
-            raise HTTPException(status_code=404, detail="Recipe not found")
 
-        # Преобразование объекта DjangoRecipe в экземпляр Pydantic-модели Recipe
-        return Recipe(**recipe.dict())
+async def fetch_recipes(connection: AsyncConnection, query, fields=tuple(RECIPE_FIELDS)):
+    rows = (await connection.execute(query)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Recipes not found")
+    return await serialize_rows(rows, fields)
+
+
+async def fetch_recipes_by_ids(connection: AsyncConnection, ids, fields=tuple(RECIPE_FIELDS)):
+    """
+    Рецепты по списку id с сохранением порядка списка
+    """
+    rows = (await connection.execute(select_recipes(fields).where(db.Recipe.id.in_(ids)))).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Recipes not found")
+    position = {pk: index for index, pk in enumerate(ids)}
+    return await serialize_rows(sorted(rows, key=lambda row: position[row.id]), fields)
+
+
+def select_by_ingredients(ingredients, match_all):
+    """
+    Запрос рецептов, в которых есть все (match_all=True) или хотя бы один из ингредиентов,
+    по связующей таблице рецептов и нормализованных ингредиентов
+    """
+    names = list(dict.fromkeys(filter(None, (normalize_ingredient(name) for name in ingredients))))
+    links = (select(db.recipe_ingredients.c.recipe_id)
+             .join(db.Ingredient, db.Ingredient.id == db.recipe_ingredients.c.ingredient_id)
+             .where(db.Ingredient.name.in_(names)))
+    if match_all:
+        links = (links.group_by(db.recipe_ingredients.c.recipe_id)
+                 .having(func.count(db.recipe_ingredients.c.ingredient_id) == len(names)))
+    return (select_recipes()
+            .where(db.Recipe.id.in_(links))
+            .order_by(db.Recipe.created_date.desc(), db.Recipe.id.desc()))
 
 
-@app.get("/recipes/by-ingredient", response_model=List[Recipe])
-def get_recipes_by_ingredient(
-        ingredient: str = Query(..., title="Ingredient", description="The ingredient to filter recipes")
+def is_not_modified(request: Request, etag, last_modified):
+    """
+    Проверка заголовков условного запроса If-None-Match / If-Modified-Since
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    if_modified_since = parse_http_date_safe(request.headers.get('if-modified-since', ''))
+    return (if_modified_since is not None and last_modified is not None
+            and int(last_modified.timestamp()) <= if_modified_since)
+
+
+def not_modified_response(request: Request, response: Response, etag, last_modified=None):
+    """
+    Заголовки ETag / Last-Modified ответа и ответ 304, если у клиента актуальная версия
+    (None - ответ нужно сформировать)
+    """
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def content_etag(data):
+    """
+    ETag по содержимому ответа. Используется маршрутами, которые все равно читают рецепты
+    целиком (поиск, фильтры): 304 экономит передачу ответа. В ответ входят имя автора
+    и название категории, которые не меняют дату изменения рецепта, поэтому Last-Modified
+    такие маршруты не отдают
+    """
+    return '"%s"' % make_etag(json.dumps(data, sort_keys=True, ensure_ascii=False))
+
+
+@app.get("/recipes", response_model=RecipeList, responses={304: {"description": "Not Modified"}})
+async def list_recipes(
+        request: Request,
+        response: Response,
+        ids: Optional[str] = Query(None, description="Comma-separated recipe ids for batch fetch, e.g. 1,2,3"),
+        cursor: Optional[str] = Query(None, description="Cursor of the next page from the previous response"),
+        limit: int = Query(20, ge=1, le=MAX_LIMIT, description="Maximum number of recipes"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,image_thumbnail"),
+        connection: AsyncConnection = Depends(db.get_connection)
 ):
     """
-    Маршрут FastAPI для получения всех рецептов, в которых есть переданный ингредиент (регистр названия ингредиента не
-    важен, при этом ищет рецепты, содержащие заданное название, а не только начинающиеся с него)
+    Маршрут FastAPI для получения списка рецептов. С параметром ids возвращает рецепты с указанными id
+    одним запросом (в порядке списка, отсутствующие пропускаются), без него - ленту рецептов от новых к старым
+    по курсору (created_date, id). Параметр fields ограничивает набор полей в ответе и столбцов в запросе к БД.
+    Сначала запрашиваются только id и даты изменения рецептов страницы: если клиент передал совпадающий
+    ETag (If-None-Match), возвращается ответ 304 без чтения и сериализации рецептов. Last-Modified не отдается:
+    переименование автора или категории и удаление рецепта не меняют даты изменения рецептов страницы
     """
-    with SessionLocal() as db_session:
-        recipes = db_session.query(DjangoRecipe).filter(DjangoRecipe.ingredients.ilike(f"%{ingredient}%")).all()
+    fields = parse_fields(fields)
+    # Имя автора и название категории не меняют дату изменения рецепта, поэтому тоже входят в ETag
+    query = select(db.Recipe.id, db.Recipe.created_date, db.Recipe.updated_date,
+                   *(RECIPE_FIELDS[field] for field in ('author', 'category') if field in fields))
+    if 'author' in fields:
+        query = query.join(db.User, db.Recipe.author_id == db.User.id)
+    if 'category' in fields:
+        query = query.join(db.Category, db.Recipe.category_id == db.Category.id)
+
+    if ids is not None:
+        try:
+            id_list = list(dict.fromkeys(int(pk) for pk in ids.split(',') if pk.strip()))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+        if not id_list or len(id_list) > MAX_LIMIT:
+            raise HTTPException(status_code=422, detail=f"ids must contain from 1 to {MAX_LIMIT} values")
+        versions = (await connection.execute(query.where(db.Recipe.id.in_(id_list)))).all()
+        position = {pk: index for index, pk in enumerate(id_list)}
+        versions.sort(key=lambda row: position[row.id])
+    else:
+        if cursor:
+            cursor_position = decode_cursor(cursor)
+            if cursor_position is None:
+                raise HTTPException(status_code=422, detail="Invalid cursor")
+            query = query.where(tuple_(db.Recipe.created_date, db.Recipe.id) < tuple_(*cursor_position))
+        query = query.order_by(db.Recipe.created_date.desc(), db.Recipe.id.desc()).limit(limit + 1)
+        versions = (await connection.execute(query)).all()
 
-        if not recipes:
-            raise HTTPException(status_code=404, detail="Recipes not found")
+    next_cursor = None
+    if ids is None and len(versions) > limit:
+        versions = versions[:limit]
+        next_cursor = encode_cursor(versions[-1].created_date, versions[-1].id)
 
-        # Преобразование объектов DjangoRecipe в экземпляры Pydantic-модели Recipe
-        recipes_data = [Recipe(**recipe.dict()) for recipe in recipes]
-        return recipes_data
+    etag = '"%s"' % make_etag(','.join(fields), *(':'.join(str(value) for value in row) for row in versions))
+    not_modified = not_modified_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
 
+    if not versions:
+        return RecipeList(items=[])
+    id_list = [row.id for row in versions]
+    rows = (await connection.execute(select_recipes(fields).where(db.Recipe.id.in_(id_list)))).all()
+    position = {pk: index for index, pk in enumerate(id_list)}
+    rows.sort(key=lambda row: position[row.id])
+    return RecipeList(items=await serialize_rows(rows, fields), next_cursor=next_cursor)
 
-@app.get("/recipes/by-category", response_model=List[Recipe])
-def get_recipes_by_category(
-        category: str = Query(..., title="Category", description="The category to filter recipes").lower()
+
+@app.get("/recipes/search", response_model=List[Recipe], responses={304: {"description": "Not Modified"}})
+async def read_recipes_by_search(
+        request: Request,
+        response: Response,
+        q: str = Query(..., title="Query", description="Search query for recipe title, description and ingredients"),
+        limit: int = Query(20, ge=1, le=MAX_LIMIT, description="Maximum number of recipes"),
+        connection: AsyncConnection = Depends(db.get_connection)
 ):
     """
-    Маршрут FastAPI для получения всех рецептов указанной категории (регистр не важен)
+    Маршрут FastAPI для полнотекстового поиска рецептов по названию, описанию и ингредиентам,
+    результаты упорядочены по релевантности. Поддерживает условный запрос If-None-Match
     """
-    with SessionLocal() as db_session:
-        recipes = db_session.query(DjangoRecipe).filter(DjangoRecipe.category.ilike(category)).all()
+    query = select_recipes()
+    if is_postgresql(connection):
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        query = (query.where(db.Recipe.search_vector.op('@@')(ts_query))
+                 .order_by(func.ts_rank(db.Recipe.search_vector, ts_query).desc(), db.Recipe.created_date.desc()))
+    else:
+        # Упрощенный поиск по подстроке для СУБД без полнотекстового индекса
+        fields = (db.Recipe.title, db.Recipe.description, db.Recipe.ingredients)
+        query = (query.where(and_(*(or_(*(field.ilike(f"%{term}%") for field in fields)) for term in q.split())))
+                 .order_by(db.Recipe.created_date.desc()))
+    recipes = await fetch_recipes(connection, query.limit(limit))
+    return not_modified_response(request, response, content_etag(recipes)) or recipes
+
 
-        if not recipes:
-            raise HTTPException(status_code=404, detail="Recipes not found")
+@app.get("/recipes/by-ingredient", response_model=List[Recipe], responses={304: {"description": "Not Modified"}})
+async def get_recipes_by_ingredient(
+        request: Request,
+        response: Response,
+        ingredient: str = Query(..., title="Ingredient", description="The ingredient to filter recipes"),
+        limit: int = Query(20, ge=1, le=MAX_LIMIT, description="Maximum number of recipes"),
+        connection: AsyncConnection = Depends(db.get_connection)
+):
+    """
+    Маршрут FastAPI для получения рецептов, в которых есть переданный ингредиент (регистр названия ингредиента не
+    важен). Поиск выполняется по нормализованному списку ингредиентов, если точных совпадений нет - нечетким
+    поиском по тексту ингредиентов (допускаются опечатки и другие формы слова).
+    Поддерживает условный запрос If-None-Match
+    """
+    rows = (await connection.execute(select_by_ingredients([ingredient], match_all=True).limit(limit))).all()
+    if rows:
+        recipes = await serialize_rows(rows)
+    elif is_postgresql(connection):
+        query = (select_recipes()
+                 .where(db.Recipe.ingredients.op('%>')(ingredient))
+                 .order_by(func.word_similarity(ingredient, db.Recipe.ingredients).desc()))
+        recipes = await fetch_recipes(connection, query.limit(limit))
+    else:
+        matches = await run_in_threadpool(FUZZY_INDEXES['ingredients'].search, ingredient, limit)
+        recipes = await fetch_recipes_by_ids(connection, [pk for pk, _ in matches])
+    return not_modified_response(request, response, content_etag(recipes)) or recipes
+
+
+@app.get("/recipes/by-ingredients", response_model=List[Recipe], responses={304: {"description": "Not Modified"}})
+async def get_recipes_by_ingredients(
+        request: Request,
+        response: Response,
+        ingredient: List[str] = Query(..., title="Ingredients", description="Ingredients to filter recipes"),
+        mode: Literal["all", "any"] = Query("all", description="Recipes with all or with any of the ingredients"),
+        limit: int = Query(20, ge=1, le=MAX_LIMIT, description="Maximum number of recipes"),
+        connection: AsyncConnection = Depends(db.get_connection)
+):
+    """
+    Маршрут FastAPI для получения рецептов, в которых есть все (mode=all) или хотя бы один (mode=any)
+    из переданных ингредиентов, например: /recipes/by-ingredients?ingredient=яйца&ingredient=мука.
+    Поддерживает условный запрос If-None-Match
+    """
+    query = select_by_ingredients(ingredient, match_all=mode == "all")
+    recipes = await fetch_recipes(connection, query.limit(limit))
+    return not_modified_response(request, response, content_etag(recipes)) or recipes
+
+
+@app.get("/recipes/by-category", response_model=List[Recipe], responses={304: {"description": "Not Modified"}})
+async def get_recipes_by_category(
+        request: Request,
+        response: Response,
+        category: str = Query(..., title="Category", description="The category to filter recipes"),
+        limit: int = Query(20, ge=1, le=MAX_LIMIT, description="Maximum number of recipes"),
+        connection: AsyncConnection = Depends(db.get_connection)
+):
+    """
+    Маршрут FastAPI для получения рецептов указанной категории (регистр не важен), новые рецепты первыми.
+    Поддерживает условный запрос If-None-Match
+    """
+    query = (select_recipes()
+             .where(func.lower(db.Category.name) == category.lower())
+             .order_by(db.Recipe.created_date.desc(), db.Recipe.id.desc()))
+    recipes = await fetch_recipes(connection, query.limit(limit))
+    return not_modified_response(request, response, content_etag(recipes)) or recipes
+
+
+@app.get("/recipes/{recipe_name}", response_model=Recipe, responses={304: {"description": "Not Modified"}})
+async def read_recipe_by_name(
+        request: Request,
+        response: Response,
+        recipe_name: str,
+        connection: AsyncConnection = Depends(db.get_connection)
+):
+    """
+    Маршрут FastAPI для чтения рецепта по названию (регистр названия рецепта не важен, допускаются опечатки,
+    возвращается наиболее похожий рецепт). Маршрут объявлен последним, чтобы не перекрывать маршруты
+    /recipes/by-ingredient и /recipes/by-category. Поддерживает условный запрос If-None-Match
+    """
+    try:
+        if is_postgresql(connection):
+            query = (select_recipes()
+                     .where(db.Recipe.title.op('%>')(recipe_name))
+                     .order_by(func.word_similarity(recipe_name, db.Recipe.title).desc())
+                     .limit(1))
+            recipes = await fetch_recipes(connection, query)
+        else:
+            matches = await run_in_threadpool(FUZZY_INDEXES['title'].search, recipe_name, 1)
+            recipes = await fetch_recipes_by_ids(connection, [pk for pk, _ in matches])
+    except HTTPException:
+        raise HTTPException(status_code=404, detail="Recipe not found")
 
-        # Преобразование объектов DjangoRecipe в экземпляры Pydantic-модели Recipe
-        recipes_data = [Recipe(**recipe.dict()) for recipe in recipes]
-        return recipes_data
+    return not_modified_response(request, response, content_etag(recipes[0])) or recipes[0]
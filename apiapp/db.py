@@ -0,0 +1,137 @@
+import os
+from datetime import timedelta
+from sqlalchemy import (
+    JSON, BigInteger, Boolean, Column, DateTime, ForeignKey, Interval, String, Table, Text, TypeDecorator
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, deferred, mapped_column
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Асинхронное подключение FastAPI к базе данных проекта и отображение таблиц моделей Django
+(webapp_recipe, webapp_category, auth_user, webapp_ingredient) на классы SQLAlchemy.
+Схемой таблиц управляют миграции Django, здесь описаны только используемые API столбцы
+"""
+
+
+def get_database_url():
+    """
+    Адрес базы данных: API_DATABASE_URL (например, для локального запуска) или
+    параметры подключения к PostgreSQL проекта из переменных окружения
+    """
+    url = os.getenv('API_DATABASE_URL')
+    if url:
+        return make_url(url)
+    return URL.create(
+        drivername='postgresql+asyncpg',
+        username=os.getenv('DATABASE_USER'),
+        password=os.getenv('DATABASE_PASSWORD'),
+        host=os.getenv('DATABASE_HOST'),
+        port=int(os.getenv('DATABASE_PORT') or 5432),
+        database=os.getenv('DATABASE_NAME'),
+    )
+
+
+def get_pool_options(url):
+    """
+    Параметры общего пула соединений процесса. Размер пула ограничивает число одновременных
+    запросов к БД, остальные запросы ожидают свободное соединение не дольше API_DB_POOL_TIMEOUT
+    """
+    if url.get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': int(os.getenv('API_DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.getenv('API_DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('API_DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('API_DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+DATABASE_URL = get_database_url()
+engine = create_async_engine(DATABASE_URL, **get_pool_options(DATABASE_URL))
+
+
+class Duration(TypeDecorator):
+    """
+    Поле DurationField Django: interval в PostgreSQL, число микросекунд в остальных СУБД
+    """
+    impl = Interval
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(Interval())
+        return dialect.type_descriptor(BigInteger())
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, int):
+            return timedelta(microseconds=value)
+        return value
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Category(Base):
+    __tablename__ = 'webapp_category'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+
+
+class User(Base):
+    __tablename__ = 'auth_user'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    username: Mapped[str] = mapped_column(String(150))
+
+
+class Ingredient(Base):
+    __tablename__ = 'webapp_ingredient'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+
+
+class Recipe(Base):
+    __tablename__ = 'webapp_recipe'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    title: Mapped[str] = mapped_column(String(150))
+    category_id: Mapped[int] = mapped_column(ForeignKey('webapp_category.id'))
+    description: Mapped[str] = mapped_column(Text)
+    ingredients: Mapped[str] = mapped_column(Text)
+    cooking_steps: Mapped[str] = mapped_column(Text)
+    cooking_time = mapped_column(Duration)
+    image: Mapped[str] = mapped_column(String(100))
+    # Уменьшенные копии изображения {формат: {ширина: имя файла}}, JSONField Django
+    image_variants = mapped_column(JSON().with_variant(JSONB(), 'postgresql'))
+    author_id: Mapped[int] = mapped_column(ForeignKey('auth_user.id'))
+    active: Mapped[bool] = mapped_column(Boolean)
+    created_date = mapped_column(DateTime(timezone=True))
+    updated_date = mapped_column(DateTime(timezone=True))
+    # Заполняется триггером PostgreSQL, используется только в условиях поиска
+    search_vector = deferred(mapped_column(TSVECTOR))
+
+
+recipe_ingredients = Table(
+    'webapp_recipe_ingredient_items',
+    Base.metadata,
+    Column('id', BigInteger, primary_key=True),
+    Column('recipe_id', ForeignKey('webapp_recipe.id')),
+    Column('ingredient_id', ForeignKey('webapp_ingredient.id')),
+)
+
+
+async def get_connection():
+    """
+    Зависимость FastAPI: соединение из общего пула на время обработки запроса
+    """
+    async with engine.connect() as connection:
+        yield connection
@@ -0,0 +1,197 @@
+import os
+from datetime import timedelta
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import create_async_engine
+from webapp.ingredients import sync_recipe_ingredients
+from webapp.models import Category, Recipe
+from webapp.search import invalidate_fuzzy_indexes
+from apiapp import db
+from apiapp.api import app
+
+
+def get_test_database_url():
+    """
+    Адрес тестовой БД Django для асинхронного драйвера API: aiosqlite для SQLite
+    (общая БД в памяти процесса) или asyncpg для PostgreSQL
+    """
+    settings_dict = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        if connection.is_in_memory_db():
+            return f"sqlite+aiosqlite:///{settings_dict['NAME']}&uri=true"
+        return f"sqlite+aiosqlite:///{settings_dict['NAME']}"
+    return URL.create(
+        drivername='postgresql+asyncpg',
+        username=settings_dict['USER'] or None,
+        password=settings_dict['PASSWORD'] or None,
+        host=settings_dict['HOST'] or None,
+        port=int(settings_dict['PORT']) if settings_dict['PORT'] else None,
+        database=settings_dict['NAME'],
+    ).render_as_string(hide_password=False)
+
+
+class RecipeAPITest(TransactionTestCase):
+    """
+    Тестирование маршрутов API рецептов. API читает данные через собственный пул соединений
+    (apiapp/db.py), поэтому используется TransactionTestCase: данные теста должны быть
+    зафиксированы в тестовой БД, к которой API подключается через API_DATABASE_URL
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.database_url = os.environ.get('API_DATABASE_URL')
+        cls.engine = db.engine
+        os.environ['API_DATABASE_URL'] = get_test_database_url()
+        db.engine = create_async_engine(db.get_database_url(), **db.get_pool_options(db.get_database_url()))
+
+    @classmethod
+    def tearDownClass(cls):
+        db.engine = cls.engine
+        if cls.database_url is None:
+            os.environ.pop('API_DATABASE_URL', None)
+        else:
+            os.environ['API_DATABASE_URL'] = cls.database_url
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        invalidate_fuzzy_indexes()
+        self.user = User.objects.create_user(username='chef', password='testpassword')
+        self.soups = Category.objects.create(name='Soups')
+        self.salads = Category.objects.create(name='Salads')
+        self.borscht = self.create_recipe('Borscht', self.soups, 'Beet, cabbage, potato')
+        self.vinaigrette = self.create_recipe('Vinaigrette', self.salads, 'Beet, pickles')
+        self.omelette = self.create_recipe('Omelette', self.salads, 'Eggs, milk')
+        # Клиент в контексте: запросы выполняются в одном цикле событий, пул закрывается в конце теста
+        self.api = TestClient(app)
+        self.api.__enter__()
+        self.addCleanup(self.api.__exit__, None, None, None)
+
+    def create_recipe(self, title, category, ingredients):
+        recipe = Recipe.objects.create(
+            title=title,
+            category=category,
+            description=f'{title} description',
+            ingredients=ingredients,
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='recipes_media/test.jpg',
+            author=self.user,
+        )
+        sync_recipe_ingredients(recipe)
+        return recipe
+
+    def get(self, url, status_code=200, **kwargs):
+        response = self.api.get(url, **kwargs)
+        self.assertEqual(response.status_code, status_code, msg=response.text)
+        return response
+
+    def titles(self, response):
+        return [recipe['title'] for recipe in response.json()]
+
+    def test_list_pages_with_cursor(self):
+        first = self.get('/recipes', params={'limit': 2}).json()
+        self.assertEqual([recipe['title'] for recipe in first['items']], ['Omelette', 'Vinaigrette'])
+        self.assertEqual(first['items'][0]['category'], 'Salads')
+        self.assertEqual(first['items'][0]['author'], 'chef')
+        self.assertEqual(first['items'][0]['cooking_time'], 30)
+        self.assertIsNotNone(first['next_cursor'])
+
+        second = self.get('/recipes', params={'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([recipe['title'] for recipe in second['items']], ['Borscht'])
+        self.assertIsNone(second['next_cursor'])
+
+        self.get('/recipes', 422, params={'cursor': 'invalid'})
+        self.get('/recipes', 422, params={'limit': 101})
+
+    def test_list_fields(self):
+        items = self.get('/recipes', params={'fields': 'id,title'}).json()['items']
+        self.assertEqual(items[0], {'id': self.omelette.pk, 'title': 'Omelette'})
+        self.get('/recipes', 422, params={'fields': 'id,unknown'})
+
+    def test_list_by_ids(self):
+        ids = f'{self.borscht.pk},{self.omelette.pk},0'
+        items = self.get('/recipes', params={'ids': ids, 'fields': 'id'}).json()['items']
+        # Порядок списка сохраняется, отсутствующие рецепты пропускаются
+        self.assertEqual(items, [{'id': self.borscht.pk}, {'id': self.omelette.pk}])
+        self.get('/recipes', 422, params={'ids': 'a,b'})
+        self.get('/recipes', 422, params={'ids': ','.join(str(pk) for pk in range(1, 102))})
+
+    def test_search(self):
+        self.assertEqual(self.titles(self.get('/recipes/search', params={'q': 'borscht'})), ['Borscht'])
+        self.get('/recipes/search', 404, params={'q': 'pizza'})
+
+    def test_by_ingredient(self):
+        response = self.get('/recipes/by-ingredient', params={'ingredient': 'BEET'})
+        self.assertEqual(self.titles(response), ['Vinaigrette', 'Borscht'])
+
+    def test_by_ingredients(self):
+        params = {'ingredient': ['beet', 'cabbage']}
+        self.assertEqual(self.titles(self.get('/recipes/by-ingredients', params=params)), ['Borscht'])
+        params['mode'] = 'any'
+        self.assertEqual(self.titles(self.get('/recipes/by-ingredients', params=params)),
+                         ['Vinaigrette', 'Borscht'])
+        self.get('/recipes/by-ingredients', 404, params={'ingredient': ['beet', 'milk']})
+
+    def test_by_category(self):
+        response = self.get('/recipes/by-category', params={'category': 'salads'})
+        self.assertEqual(self.titles(response), ['Omelette', 'Vinaigrette'])
+        self.get('/recipes/by-category', 404, params={'category': 'Desserts'})
+
+    def test_recipe_by_name(self):
+        self.assertEqual(self.get('/recipes/omelette').json()['title'], 'Omelette')
+        # Допускаются опечатки
+        self.assertEqual(self.get('/recipes/Borsht').json()['title'], 'Borscht')
+        self.get('/recipes/xyzxyzxyz', 404)
+
+    def test_recipe_by_name_does_not_shadow_routes(self):
+        # Рецепт с названием маршрута не перекрывает маршруты списков
+        self.create_recipe('by-category', self.soups, 'Water')
+        response = self.get('/recipes/by-category', params={'category': 'Soups'})
+        self.assertEqual(self.titles(response), ['by-category', 'Borscht'])
+        self.get('/recipes/by-category', 422)
+        self.assertIsInstance(self.get('/recipes/search', params={'q': 'omelette'}).json(), list)
+
+    def test_list_not_modified(self):
+        response = self.get('/recipes', params={'limit': 2})
+        etag = response.headers['ETag']
+        # Переименование автора не меняет даты изменения рецептов, поэтому проверяется только ETag
+        self.assertNotIn('Last-Modified', response.headers)
+        self.get('/recipes', params={'limit': 2}, headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+
+        not_modified = self.get('/recipes', 304, params={'limit': 2}, headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified.headers['ETag'], etag)
+        # Другой набор полей - другой ответ
+        self.get('/recipes', params={'limit': 2, 'fields': 'id'}, headers={'If-None-Match': etag})
+
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.get('/recipes', params={'limit': 2}, headers={'If-None-Match': etag})
+        etag = response.headers['ETag']
+
+        self.omelette.description = 'Updated description'
+        self.omelette.save()
+        self.get('/recipes', params={'limit': 2}, headers={'If-None-Match': etag})
+
+    def test_routes_not_modified(self):
+        urls = [
+            ('/recipes/search', {'q': 'borscht'}),
+            ('/recipes/by-ingredient', {'ingredient': 'beet'}),
+            ('/recipes/by-ingredients', {'ingredient': ['beet', 'cabbage']}),
+            ('/recipes/by-category', {'category': 'Soups'}),
+            ('/recipes/Borscht', {}),
+        ]
+        etags = {url: self.get(url, params=params).headers['ETag'] for url, params in urls}
+        for url, params in urls:
+            self.get(url, 304, params=params, headers={'If-None-Match': etags[url]})
+
+        # Переименование категории меняет ответы, хотя дата изменения рецептов прежняя
+        self.soups.name = 'Soup'
+        self.soups.save()
+        self.get('/recipes/Borscht', headers={'If-None-Match': etags['/recipes/Borscht']})
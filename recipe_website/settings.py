@@ -73,6 +73,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'webapp.context_processors.categories',
             ],
         },
     },
@@ -94,6 +95,31 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# При запуске нескольких процессов нужен общий кэш (например, Redis или Memcached),
+# иначе сброс кэша в одном процессе не будет виден остальным
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Время хранения страниц в кэше (webapp/page_cache.py). Страницы
+# сбрасываются при изменении показанных на них данных, поэтому время может быть большим
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 3600))
+
+# Время хранения карточек рецептов в кэше (одинаковы для всех пользователей, в том числе
+# авторизованных). Ключ карточки меняется при изменении рецепта или его автора
+RECIPE_CARD_CACHE_TIMEOUT = int(os.getenv('RECIPE_CARD_CACHE_TIMEOUT', 86400))
+
+# Кэш рецептов для страницы рецепта (webapp/object_cache.py): количество рецептов в памяти
+# каждого процесса и время хранения в общем кэше
+RECIPE_LOCAL_CACHE_SIZE = int(os.getenv('RECIPE_LOCAL_CACHE_SIZE', 1000))
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 3600))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -127,7 +153,15 @@ USE_I18N = True
 
 USE_TZ = True
 
-DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Медиафайлы хранятся с адресацией по содержимому и подсчетом ссылок (webapp/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'webapp.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
@@ -139,6 +173,22 @@ MEDIA_URL = '/media/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загруженные файлы всегда записываются во временный файл на диске, а не в память процесса.
+# Изображения больше MAX_IMAGE_UPLOAD_SIZE байт или MAX_IMAGE_PIXELS пикселей отклоняются
+# по заголовку файла, до декодирования (webapp/uploads.py)
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+MAX_IMAGE_UPLOAD_SIZE = int(os.getenv('MAX_IMAGE_UPLOAD_SIZE', 20 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 50_000_000))
+
+# Отдача медиафайлов (webapp/media.py): права проверяет Django, файл передает веб-сервер.
+# stream - потоковая отдача средствами Django (разработка), x-accel-redirect - nginx:
+#     location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+# x-sendfile - Apache с модулем mod_xsendfile (XSendFile On, XSendFilePath <MEDIA_ROOT>)
+MEDIA_SERVE_METHOD = os.getenv('MEDIA_SERVE_METHOD', 'stream')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# Время кэширования файлов, сохраненных до перехода на хранилище с адресацией по содержимому
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', 86400))
+
 # Дополнительные директории со статикой (при необходимости)
 # STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'),
 #                     os.path.join(BASE_DIR, 'media')]
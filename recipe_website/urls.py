@@ -1,5 +1,6 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from usersapp import views as user_views
@@ -15,10 +16,12 @@ urlpatterns = [
     path('profile/', user_views.profile, name='profile'),
     path('login/', user_views.CustomLoginView.as_view(), name='login'),
     path('logout/', user_views.CustomLogoutView.as_view(), name='logout'),
+    # Медиафайлы отдаются с проверкой прав доступа (в production передачу выполняет веб-сервер)
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), webapp_views.MediaView.as_view(),
+            name='media'),
     path('', include('webapp.urls')),
 ]
 
-# включаем возможность обработки картинок в режиме DEBUG
+# включаем возможность обработки статики в режиме DEBUG
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
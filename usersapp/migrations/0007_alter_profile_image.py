@@ -0,0 +1,20 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:16
+
+import usersapp.models
+import webapp.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usersapp', '0006_alter_profile_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(default='avatar_default_cblgpyo.jpg', upload_to=usersapp.models.user_directory_path, validators=[webapp.uploads.validate_image_upload], verbose_name='Аватар'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:19
+
+import base64
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_avatar_placeholders(apps, schema_editor):
+    # Размеры и превью уже загруженных аватарок (аватарки хранятся уменьшенными до 300x300)
+    Profile = apps.get_model('usersapp', 'Profile')
+    for profile in Profile.objects.exclude(image='avatar_default_cblgpyo.jpg').only('pk', 'image').iterator():
+        try:
+            with default_storage.open(profile.image.name) as file, Image.open(file) as image:
+                width, height = image.size
+                preview = image.convert('RGB')
+            preview.thumbnail((16, 16))
+            buffer = BytesIO()
+            preview.save(buffer, 'JPEG', quality=40, optimize=True)
+        except (OSError, ValueError):
+            continue
+        Profile.objects.filter(pk=profile.pk).update(
+            image_width=width, image_height=height,
+            image_placeholder='data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usersapp', '0007_alter_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота аватара'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Превью аватара'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина аватара'),
+        ),
+        migrations.RunPython(fill_avatar_placeholders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:12
+
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image, features
+
+
+def fill_avatar_variants(apps, schema_editor):
+    # Копии уже загруженных аватарок в форматах AVIF и WebP (аватарки небольшие, 300x300)
+    Profile = apps.get_model('usersapp', 'Profile')
+    formats = {'webp': ('WEBP', {'quality': 80, 'method': 6})}
+    if features.check('avif'):
+        formats['avif'] = ('AVIF', {'quality': 60})
+    for profile in Profile.objects.exclude(image='avatar_default_cblgpyo.jpg').only('pk', 'image').iterator():
+        variants = {}
+        try:
+            with default_storage.open(profile.image.name) as file, Image.open(file) as image:
+                if getattr(image, 'is_animated', False):
+                    continue
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+                for image_format, (pil_format, options) in formats.items():
+                    buffer = BytesIO()
+                    image.save(buffer, pil_format, **options)
+                    name = f'{os.path.splitext(profile.image.name)[0]}.{image_format}'
+                    variants[image_format] = default_storage.save(name, ContentFile(buffer.getvalue()))
+        except (OSError, ValueError):
+            continue
+        Profile.objects.filter(pk=profile.pk).update(image_variants=variants)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usersapp', '0008_profile_image_height_profile_image_placeholder_and_more'),
+        # Копии записываются через хранилище с учетом ссылок на файлы (таблица webapp_mediafile)
+        ('webapp', '0018_media_deletions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Копии аватара'),
+        ),
+        migrations.RunPython(fill_avatar_variants, migrations.RunPython.noop),
+    ]
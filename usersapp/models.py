@@ -1,6 +1,15 @@
+import os
+from io import BytesIO
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from PIL import Image
+from webapp.images import IMAGE_FORMATS, make_placeholder, processed_image_name, save_image
+from webapp.models import MODERN_IMAGE_FORMATS
+from webapp.storage import defer_delete
+from webapp.tracking import ChangeTrackingMixin
+from webapp.uploads import draft_image, image_too_large, validate_image_upload
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,10 +23,66 @@ def user_directory_path(instance, filename):
     return 'users_media/profile_pics/user_{0}/{1}'.format(instance.user.id, filename)
 
 
-class Profile(models.Model):
+# Максимальный размер аватарки и допустимые расширения файла
+AVATAR_SIZE = (300, 300)
+AVATAR_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+DEFAULT_AVATAR = 'avatar_default_cblgpyo.jpg'
+
+
+def resize_avatar(file):
+    """
+    Уменьшение загруженной аватарки в памяти, до записи файла в хранилище.
+    Возвращает None, если изображение не превышает допустимый размер
+    """
+    img = Image.open(file)
+    if img.width <= AVATAR_SIZE[0] and img.height <= AVATAR_SIZE[1]:
+        return None
+    if image_too_large(*img.size):
+        raise ValueError(f'Image is too large: {img.width}x{img.height}')
+    image_format = img.format
+    # JPEG декодируется сразу в уменьшенном масштабе
+    draft_image(img, *AVATAR_SIZE)
+    img.thumbnail(AVATAR_SIZE)
+    buffer = BytesIO()
+    img.save(buffer, format=image_format)
+    return ContentFile(buffer.getvalue())
+
+
+def avatar_preview(file):
+    """
+    Размеры аватарки и ее превью для встраивания в страницу (файл уже уменьшен)
+    """
+    file.seek(0)
+    with Image.open(file) as img:
+        return img.width, img.height, make_placeholder(img)
+
+
+def save_avatar_variants(file):
+    """
+    Копии аватарки (файл уже уменьшен) в более компактных форматах для тега <picture>:
+    {формат: имя файла}. Для анимированных изображений копии не создаются, чтобы браузер
+    не показал вместо анимации ее первый кадр
+    """
+    file.seek(0)
+    with Image.open(file) as img:
+        if getattr(img, 'is_animated', False):
+            return {}
+        img.load()
+        return {image_format: save_image(img, processed_image_name(file.name, image_format=image_format),
+                                         image_format)
+                for image_format in MODERN_IMAGE_FORMATS if image_format in IMAGE_FORMATS}
+
+
+class Profile(ChangeTrackingMixin, models.Model):
     user: User = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="Пользователь сайта")
-    image = models.ImageField(default='avatar_default_cblgpyo.jpg', upload_to=user_directory_path,
-                              verbose_name="Аватар")
+    image = models.ImageField(default=DEFAULT_AVATAR, upload_to=user_directory_path,
+                              validators=[validate_image_upload], verbose_name="Аватар")
+    # Размеры аватарки и ее превью (data URI) вычисляются при загрузке, для аватарки по умолчанию не заполняются
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ширина аватара")
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Высота аватара")
+    image_placeholder = models.TextField(blank=True, editable=False, verbose_name="Превью аватара")
+    # Копии загруженной аватарки в форматах AVIF и WebP: {формат: имя файла}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Копии аватара")
 
     class Meta:
         verbose_name = 'Профиль пользователя сайта'
@@ -26,35 +91,47 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.user.username} Profile'
 
+    @property
+    def image_sources(self):
+        """
+        Элементы <source> тега <picture>: браузер загружает копию в первом поддерживаемом формате
+        """
+        return [{'type': f'image/{image_format}', 'srcset': default_storage.url(self.image_variants[image_format])}
+                for image_format in MODERN_IMAGE_FORMATS if image_format in self.image_variants]
+
     def save(self, *args, **kwargs):
         """
         Переопределение метода save для сжатия загруженных пользователем аватарок,
-        а также удаление старых аватарок, при их обновлении новыми
+        а также удаление старых аватарок, при их обновлении новыми.
+        Изображение обрабатывается только при загрузке нового файла, сохранение профиля
+        без изменений не обращается ни к файлам, ни к БД (ChangeTrackingMixin)
         """
         try:
-            super().save(*args, **kwargs)
-
-            # Допустимые расширения файла
-            valid_extensions = ['.jpg', '.jpeg', '.png', '.gif']
+            image_changed = bool(self.image) and self.has_changed('image')
+            old_image = None
+            old_variants = {}
+            if image_changed:
+                if not self._state.adding:
+                    old_image = self.get_loaded_value('image')
+                    old_variants = self.get_loaded_value('image_variants') or {}
+                self.image_width = self.image_height = None
+                self.image_placeholder = ''
+                self.image_variants = {}
+                if not self.image._committed and self.image.name.lower().endswith(AVATAR_EXTENSIONS):
+                    content = resize_avatar(self.image)
+                    if content is not None:
+                        # Уменьшенное изображение сразу записывается в хранилище вместо исходного
+                        self.image.save(os.path.basename(self.image.name), content, save=False)
+                    self.image_width, self.image_height, self.image_placeholder = avatar_preview(self.image)
+                    self.image_variants = save_avatar_variants(self.image)
 
-            if any(self.image.path.lower().endswith(ext) for ext in valid_extensions):
-                # Проверка, что загруженный файл является изображением
-                img = Image.open(self.image.path)
+            super().save(*args, **kwargs)
 
-                if img.width > 300 or img.height > 300:
-                    # Сжимаем изображение
-                    output_size = (300, 300)
-                    img.thumbnail(output_size)
-                    img.save(self.image.path)
+            # Хранилище считает ссылки на файлы, поэтому старая аватарка освобождается,
+            # даже если загружено то же самое изображение (в фоновом обработчике)
+            if old_image and old_image != DEFAULT_AVATAR:
+                defer_delete(old_image)
+            for name in old_variants.values():
+                defer_delete(name)
         except Exception as e:
             logger.error(f"An error occurred while saving profile image: {str(e)}")
-
-    def delete(self, *args, **kwargs):
-        """
-        Переопределение метода delete для удаления изображения при удалении профиля
-        """
-        try:
-            self.image.delete()
-            super().delete(*args, **kwargs)
-        except Exception as e:
-            logger.error(f"An error occurred while deleting profile: {str(e)}")
@@ -1,13 +1,17 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from webapp.cache import invalidate_author, invalidate_pages
+from webapp.storage import defer_delete
+from .models import DEFAULT_AVATAR, Profile
 import logging
 
 logger = logging.getLogger(__name__)
 
 """
 Автоматическое создание профилей (модель Profile) при регистрации пользователя на сайте
+и освобождение аватарок удаленных профилей
 """
 
 
@@ -21,8 +25,69 @@ def create_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
+def save_profile(sender, instance, created, update_fields=None, **kwargs):
+    # Новый профиль только что создан, частичные обновления пользователя (например, last_login
+    # при каждой авторизации) и сохранения, при которых профиль не загружался и не мог быть изменен,
+    # пропускаются
+    if created or update_fields is not None or not User.profile.is_cached(instance):
+        return
     try:
         instance.profile.save()
     except Exception as e:
         logger.error(f"An error occurred while saving profile for user {instance.username}: {str(e)}")
+
+
+@receiver(post_delete, sender=Profile)
+def delete_profile_image(sender, instance, **kwargs):
+    # Сигнал отправляется и при удалении профиля вместе с пользователем (CASCADE),
+    # и при удалении через QuerySet.delete(), в которых метод модели delete не вызывается
+    try:
+        if instance.image and instance.image.name != DEFAULT_AVATAR:
+            defer_delete(instance.image.name)
+        for name in (instance.image_variants or {}).values():
+            defer_delete(name)
+    except Exception as e:
+        logger.error(f"An error occurred while deleting profile image: {str(e)}")
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Имя пользователя на момент загрузки из БД (отложенное поле не читается), по нему
+    # после переименования сбрасывается прежняя страница автора
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def invalidate_author_cache(sender, instance, created=False, **kwargs):
+    # Имя и аватарка автора показываются на страницах с его рецептами и хранятся в закэшированных
+    # рецептах. Кэш сбрасывается только при их изменении, остальные сохранения пользователя
+    # (например, last_login) и профиля кэш не меняют
+    if created:
+        return
+    try:
+        if sender is User:
+            previous = getattr(instance, '_loaded_username', None)
+            instance._loaded_username = instance.username
+            if previous == instance.username:
+                return
+            author_id, usernames = instance.pk, [previous, instance.username]
+        else:
+            # Значения полей профиля запоминаются после отправки сигнала (ChangeTrackingMixin)
+            if not instance.has_changed('image'):
+                return
+            author_id, usernames = instance.user_id, [instance.user.username]
+        transaction.on_commit(lambda: invalidate_author(author_id, usernames))
+    except Exception as e:
+        logger.error(f"An error occurred while invalidating author cache: {str(e)}")
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author_pages(sender, instance, **kwargs):
+    # Рецепты удаляются вместе с пользователем и сбрасывают свои страницы сами,
+    # страница удаленного автора больше не существует
+    try:
+        username = instance.username
+        transaction.on_commit(lambda: invalidate_pages(f'author:{username}'))
+    except Exception as e:
+        logger.error(f"An error occurred while invalidating author pages: {str(e)}")
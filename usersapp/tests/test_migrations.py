@@ -0,0 +1,52 @@
+import os
+from io import BytesIO
+from PIL import Image
+from django.test import TransactionTestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from webapp.tests.utils import TemporaryMediaMixin
+
+
+class AvatarVariantsMigrationTest(TemporaryMediaMixin, TransactionTestCase):
+    """
+    Тестирование миграции 0009 на БД с аватаркой, загруженной до перехода на хранилище
+    с адресацией по содержимому (webapp 0017)
+    """
+    migrate_from = [('usersapp', '0008_profile_image_height_profile_image_placeholder_and_more'),
+                    ('webapp', '0016_recipe_image_variant_formats')]
+    migrate_to = [('usersapp', '0009_profile_image_variants')]
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.migrate, None)
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('auth', 'User')
+        Profile = apps.get_model('usersapp', 'Profile')
+
+        self.image = 'users_media/profile_pics/user_1/avatar.png'
+        os.makedirs(os.path.join(self.media_root, os.path.dirname(self.image)))
+        Image.new('RGB', (120, 80), 'blue').save(os.path.join(self.media_root, self.image), 'PNG')
+        user = User.objects.create(username='testuser')
+        self.profile_id = Profile.objects.create(user=user, image=self.image).pk
+
+    def migrate(self, targets):
+        """
+        Миграция БД к указанному состоянию (None - ко всем миграциям проекта), возвращает модели этого состояния
+        """
+        executor = MigrationExecutor(connection)
+        if targets is None:
+            targets = executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        return MigrationExecutor(connection).loader.project_state(targets).apps
+
+    def test_existing_avatar_gets_variants(self):
+        apps = self.migrate(self.migrate_to)
+        profile = apps.get_model('usersapp', 'Profile').objects.get(pk=self.profile_id)
+
+        self.assertIn('webp', profile.image_variants)
+        for image_format, name in profile.image_variants.items():
+            with Image.open(os.path.join(self.media_root, name)) as img:
+                self.assertEqual((img.format.lower(), img.size), (image_format, (120, 80)))
+        # Копии записаны через хранилище и учитываются в таблице файлов
+        MediaFile = apps.get_model('webapp', 'MediaFile')
+        self.assertEqual(set(MediaFile.objects.values_list('name', flat=True)), set(profile.image_variants.values()))
@@ -1,6 +1,15 @@
+import os
+from io import BytesIO
+from unittest import mock
+from PIL import Image
 from django.test import TestCase
 from django.contrib.auth.models import User
-from ..models import Profile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.loader import render_to_string
+from webapp.models import MediaDeletion
+from webapp.storage import release_deferred
+from webapp.tests.utils import TemporaryMediaMixin
+from ..models import DEFAULT_AVATAR, Profile
 
 
 class ProfileModelTest(TestCase):
@@ -44,3 +53,97 @@ class ProfileModelTest(TestCase):
         img = profile.image.open()
         self.assertEqual(img.width, 0)
         self.assertEqual(img.height, 0)
+
+
+class AvatarProcessingTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование обработки аватарок: только при загрузке нового изображения
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def make_image(self, name='avatar.jpg', size=(800, 600)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_login_does_not_save_profile(self):
+        with mock.patch.object(Profile, 'save') as save:
+            self.assertTrue(self.client.login(username='testuser', password='testpassword'))
+        save.assert_not_called()
+
+    def test_upload_is_resized_before_saving(self):
+        profile = self.user.profile
+        profile.image = self.make_image()
+        profile.save()
+
+        with Image.open(profile.image.path) as img:
+            self.assertEqual(img.size, (300, 225))
+        self.assertEqual((profile.image_width, profile.image_height), (300, 225))
+        self.assertTrue(profile.image_placeholder.startswith('data:image/jpeg;base64,'))
+        # В хранилище записаны только уменьшенный файл и его копии в других форматах
+        files = {name for _, _, names in os.walk(self.media_root) for name in names}
+        self.assertEqual(files, {os.path.basename(name) for name in [profile.image.name,
+                                                                      *profile.image_variants.values()]})
+
+    def test_upload_has_modern_formats(self):
+        profile = self.user.profile
+        profile.image = self.make_image(size=(200, 200))
+        profile.save()
+
+        self.assertIn('webp', profile.image_variants)
+        for image_format, name in profile.image_variants.items():
+            with Image.open(os.path.join(self.media_root, name)) as img:
+                self.assertEqual((img.format.lower(), img.size), (image_format, (200, 200)))
+        self.assertEqual(Profile.objects.get(pk=profile.pk).image_variants, profile.image_variants)
+
+        html = render_to_string('webapp/includes/avatar.html', {'profile': profile})
+        webp = profile.image_variants['webp']
+        self.assertInHTML(f'<source type="image/webp" srcset="/media/{webp}">', html)
+        self.assertIn('<picture>', html)
+
+    def test_old_avatar_is_deleted(self):
+        profile = self.user.profile
+        profile.image = self.make_image('first.jpg')
+        profile.save()
+        first_path = profile.image.path
+        first_variants = [os.path.join(self.media_root, name) for name in profile.image_variants.values()]
+
+        profile.image = self.make_image('second.jpg', size=(200, 200))
+        profile.save()
+        self.assertTrue(os.path.exists(first_path))
+        release_deferred()
+        for path in [first_path, *first_variants]:
+            self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(profile.image.path))
+
+    def test_avatar_is_deleted_with_user(self):
+        profile = self.user.profile
+        profile.image = self.make_image()
+        profile.save()
+        paths = [profile.image.path, *(os.path.join(self.media_root, name) for name in profile.image_variants.values())]
+
+        # Профиль удаляется каскадно, без вызова метода delete модели
+        self.user.delete()
+        release_deferred()
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_default_avatar_has_no_picture(self):
+        html = render_to_string('webapp/includes/avatar.html', {'profile': self.user.profile})
+        self.assertNotIn('<picture>', html)
+
+    def test_default_avatar_is_not_deleted(self):
+        user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.assertEqual(user.profile.image.name, DEFAULT_AVATAR)
+        user.delete()
+        self.assertFalse(MediaDeletion.objects.exists())
+
+    def test_save_without_new_image_skips_processing(self):
+        profile = self.user.profile
+        with mock.patch('usersapp.models.resize_avatar') as resize:
+            profile.save()
+            self.user.save()
+        resize.assert_not_called()
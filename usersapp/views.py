@@ -3,7 +3,6 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, LogoutView
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
-from webapp.models import Category
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,11 +23,8 @@ def register(request):
         else:
             form = UserRegisterForm()
 
-        categories = Category.objects.all()
-
         context = {
             'form': form,
-            'categories': categories
         }
 
         return render(request, 'usersapp/register.html', context=context)
@@ -59,12 +55,9 @@ def profile(request):
             u_form = UserUpdateForm(instance=request.user)
             p_form = ProfileUpdateForm(instance=request.user.profile)
 
-        categories = Category.objects.all()
-
         context = {
             'u_form': u_form,
             'p_form': p_form,
-            'categories': categories
         }
 
         return render(request, 'usersapp/profile.html', context=context)
@@ -77,29 +70,13 @@ def profile(request):
 
 class CustomLoginView(LoginView):
     """
-    Обработчик переменной 'categories' для меню категорий рецептов на странице авторизации
+    Страница авторизации пользователя на сайте
     """
     template_name = 'usersapp/login.html'
 
-    def get_context_data(self, **kwargs):
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in CustomLoginView: {str(e)}")
-
 
 class CustomLogoutView(LogoutView):
     """
-    Обработчик переменной 'categories' для меню категорий рецептов на странице успешного выхода
+    Страница успешного выхода пользователя с сайта
     """
     template_name = 'usersapp/logout.html'
-
-    def get_context_data(self, **kwargs):
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in CustomLogoutView: {str(e)}")
@@ -1,9 +1,29 @@
 from django.contrib import admin
-from .models import Category, Recipe
+from .models import AuthorStats, Category, ImageJob, Ingredient, Recipe
 
 admin.site.site_title = 'Админ-панель сайта ВкуснаяЕда'
 admin.site.site_header = 'Админ-панель сайта ВкуснаяЕда'
 
-# Отображение моделей Category и Recipe в админке проекта
+# Отображение моделей Category, Recipe, Ingredient, ImageJob и AuthorStats в админке проекта
 admin.site.register(Category)
 admin.site.register(Recipe)
+admin.site.register(Ingredient)
+admin.site.register(ImageJob)
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    """
+    Статистика авторов только для просмотра: счетчики меняются вместе с рецептами
+    и командой recount_recipes (webapp/counters.py)
+    """
+    list_display = ('author', 'recipes_count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,7 @@ class WebappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'webapp'
     verbose_name = 'Сайт рецептов'
+
+    # Для сброса кэша меню категорий при их изменении
+    def ready(self):
+        import webapp.signals
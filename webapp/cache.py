@@ -0,0 +1,178 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from .models import Category, Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ключи версий закэшированных данных. Версия - время последнего изменения данных
+# в микросекундах, поэтому она же используется как дата изменения (Last-Modified)
+CATEGORIES_VERSION_KEY = 'webapp:categories:version'
+RECIPES_VERSION_KEY = 'webapp:recipes:version'
+
+# Шаблон ключа списка категорий
+CATEGORIES_KEY = 'webapp:categories:{version}'
+
+# Версия всех закэшированных страниц (для сброса всех страниц сразу) и версии групп страниц:
+# лента, страница рецепта, категории, автора
+PAGES_VERSION_KEY = 'webapp:pages:version'
+PAGE_TAG_VERSION_KEY = 'webapp:pages:{tag}:version'
+PAGE_KEY = 'webapp:page:{path}:{versions}'
+
+# Шаблон ключа карточки рецепта в списках
+RECIPE_CARD_KEY = 'webapp:card:{id}:{version}'
+
+# Версия отдельного рецепта (меняется и при изменении данных его автора), версия данных авторов
+# для списков рецептов (имя, аватарка), шаблоны ключей закэшированного рецепта и блокировки
+# его загрузки из БД (webapp/object_cache.py)
+RECIPE_VERSION_KEY = 'webapp:recipe:{id}:version'
+AUTHORS_VERSION_KEY = 'webapp:authors:version'
+RECIPE_KEY = 'webapp:recipe:{id}:{versions}'
+RECIPE_LOCK_KEY = 'webapp:recipe:{id}:lock'
+
+
+def get_version(key):
+    """
+    Текущая версия данных. Если версия отсутствует в кэше (например, после перезапуска),
+    данные считаются измененными сейчас
+    """
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns() // 1000
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(keys):
+    """
+    Текущие версии нескольких ключей одним запросом к кэшу
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = get_version(key)
+    return versions
+
+
+def bump_version(key):
+    """
+    Смена версии данных, записи кэша со старой версией перестают использоваться
+    """
+    previous = cache.get(key) or 0
+    cache.set(key, max(time.time_ns() // 1000, previous + 1), timeout=None)
+
+
+def version_to_datetime(version):
+    return datetime.fromtimestamp(version / 1_000_000, tz=timezone.utc)
+
+
+def get_categories_version():
+    """
+    Текущая версия закэшированного списка категорий
+    """
+    return get_version(CATEGORIES_VERSION_KEY)
+
+
+def get_categories():
+    """
+    Список категорий для меню сайта. Запрос к БД выполняется только
+    при первом обращении после изменения версии списка
+    """
+    key = CATEGORIES_KEY.format(version=get_categories_version())
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.order_by('pk'))
+        cache.set(key, categories, timeout=None)
+    return categories
+
+
+def invalidate_categories():
+    bump_version(CATEGORIES_VERSION_KEY)
+    logger.debug("Categories cache invalidated")
+
+
+def get_recipes_version():
+    """
+    Версия списков рецептов, меняется при добавлении, изменении и удалении любого рецепта
+    """
+    return get_version(RECIPES_VERSION_KEY)
+
+
+def invalidate_recipes():
+    bump_version(RECIPES_VERSION_KEY)
+    logger.debug("Recipes version changed")
+
+
+def invalidate_recipe(recipe_id):
+    """
+    Сброс закэшированного рецепта после его изменения или удаления
+    """
+    bump_version(RECIPE_VERSION_KEY.format(id=recipe_id))
+    logger.debug(f"Recipe {recipe_id} cache invalidated")
+
+
+def page_cache_key(path, tags):
+    """
+    Ключ закэшированной страницы: адрес страницы (с используемыми ею параметрами, например курсором
+    страницы) и версии всех групп, в которые она входит, а также версия списка категорий
+    """
+    keys = [PAGES_VERSION_KEY, CATEGORIES_VERSION_KEY] + [PAGE_TAG_VERSION_KEY.format(tag=tag) for tag in tags]
+    versions = get_versions(keys)
+    return PAGE_KEY.format(path=hashlib.md5(path.encode()).hexdigest(),
+                           versions='.'.join(str(versions[key]) for key in keys))
+
+
+def invalidate_pages(*tags):
+    """
+    Сброс закэшированных страниц указанных групп, без параметров - всех страниц
+    """
+    for key in [PAGE_TAG_VERSION_KEY.format(tag=tag) for tag in tags] or [PAGES_VERSION_KEY]:
+        bump_version(key)
+    logger.debug(f"Pages cache invalidated: {', '.join(tags) or 'all'}")
+
+
+def invalidate_recipe_pages(recipe_id, category_ids=(), author_ids=()):
+    """
+    Сброс страниц, на которых показывается рецепт: страница рецепта, лента,
+    страницы его категорий и авторов (прежних и новых, если они изменились).
+    Вызывается после завершения транзакции
+    """
+    author_ids = [pk for pk in author_ids if pk]
+    usernames = User.objects.filter(pk__in=author_ids).values_list('username', flat=True) if author_ids else []
+    invalidate_pages('feed', f'recipe:{recipe_id}', *(f'category:{pk}' for pk in category_ids if pk),
+                     *(f'author:{username}' for username in usernames))
+
+
+def invalidate_author(author_id, usernames=()):
+    """
+    Сброс кэша после изменения имени или аватарки автора: его закэшированных рецептов и страниц
+    автора (по прежнему и новому имени), а если у автора есть рецепты - ленты, страниц этих
+    рецептов и их категорий (страницы показывают рецепты независимо от публикации).
+    Рецепты и страницы других авторов остаются в кэше. Вызывается после завершения транзакции
+    """
+    recipes = list(Recipe.objects.filter(author_id=author_id).values_list('pk', 'category_id'))
+    for recipe_id, category_id in recipes:
+        bump_version(RECIPE_VERSION_KEY.format(id=recipe_id))
+    tags = [f'author:{username}' for username in usernames if username]
+    if recipes:
+        # Версия данных авторов входит в ETag списков рецептов (webapp/conditional.py)
+        bump_version(AUTHORS_VERSION_KEY)
+        tags += ['feed', *(f'recipe:{recipe_id}' for recipe_id, category_id in recipes),
+                 *{f'category:{category_id}' for recipe_id, category_id in recipes}]
+    if tags:
+        invalidate_pages(*tags)
+
+
+def recipe_card_key(recipe, loading):
+    """
+    Ключ карточки рецепта. Дата изменения рецепта обновляется при каждом сохранении
+    и при завершении обработки изображения, имя и аватарка автора показываются в карточке,
+    поэтому тоже входят в версию
+    """
+    profile = recipe.author.profile
+    version = f'{recipe.updated_date.timestamp()}:{recipe.author.username}:{profile.image.name}:{loading}'
+    return RECIPE_CARD_KEY.format(id=recipe.id, version=hashlib.md5(version.encode()).hexdigest())
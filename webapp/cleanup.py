@@ -0,0 +1,85 @@
+import os
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from usersapp.models import DEFAULT_AVATAR, Profile
+from .models import ImageJob, MediaDeletion, MediaFile, Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Поиск и удаление медиафайлов, на которые не ссылается ни один объект (команда collect_media).
+Такие файлы остаются после сбоев при сохранении и удалении рецептов и профилей.
+Дерево каталогов обходится потоково (os.scandir), поэтому список файлов не загружается в память
+"""
+
+
+def scan_media(root=None):
+    """
+    Файлы медиакаталога: имя в хранилище и время изменения
+    """
+    root = root or settings.MEDIA_ROOT
+    directories = ['']
+    while directories:
+        directory = directories.pop()
+        try:
+            entries = os.scandir(os.path.join(root, directory))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = f'{directory}/{entry.name}' if directory else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry.stat(follow_symlinks=False).st_mtime
+
+
+def referenced_media(batch_size=2000):
+    """
+    Имена всех используемых файлов: изображения рецептов и их копии, аватарки и их копии,
+    исходные файлы заданий обработки. Объекты загружаются из БД частями
+    """
+    names = {DEFAULT_AVATAR}
+    for image, variants in Recipe.objects.values_list('image', 'image_variants').iterator(chunk_size=batch_size):
+        names.add(image)
+        names.update(name for files in (variants or {}).values() for name in files.values())
+    for image, variants in Profile.objects.values_list('image', 'image_variants').iterator(chunk_size=batch_size):
+        names.add(image)
+        names.update((variants or {}).values())
+    names.update(ImageJob.objects.filter(status__in=[ImageJob.Status.PENDING, ImageJob.Status.RUNNING])
+                 .values_list('source', flat=True).iterator(chunk_size=batch_size))
+    names.discard('')
+    return names
+
+
+def is_referenced(name):
+    """
+    Повторная проверка одного файла перед удалением: ссылка могла появиться после
+    загрузки списка используемых файлов
+    """
+    return (name == DEFAULT_AVATAR
+            or Recipe.objects.filter(Q(image=name) | Q(image_variants__icontains=name)).exists()
+            or Profile.objects.filter(Q(image=name) | Q(image_variants__icontains=name)).exists()
+            or ImageJob.objects.filter(source=name, status__in=[ImageJob.Status.PENDING,
+                                                                 ImageJob.Status.RUNNING]).exists())
+
+
+def delete_orphan(name):
+    """
+    Удаление неиспользуемого файла вместе с записями о нем. Возвращает False,
+    если файл оказался используемым
+    """
+    with transaction.atomic():
+        # Блокировка записи о файле: хранилище не добавит на него новую ссылку до конца транзакции
+        list(MediaFile.objects.select_for_update().filter(name=name))
+        if is_referenced(name):
+            return False
+        MediaFile.objects.filter(name=name).delete()
+        MediaDeletion.objects.filter(name=name).delete()
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, name))
+        except FileNotFoundError:
+            pass
+    return True
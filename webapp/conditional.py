@@ -0,0 +1,105 @@
+import hashlib
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .cache import (AUTHORS_VERSION_KEY, CATEGORIES_VERSION_KEY, RECIPE_VERSION_KEY, RECIPES_VERSION_KEY, get_versions,
+                    version_to_datetime)
+from .object_cache import get_recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag / Last-Modified) для страниц с рецептами: если страница
+    не изменилась, возвращается ответ 304 без выполнения запросов представления и отрисовки шаблона.
+    Страницы не зависят от пользователя (персональная часть загружается отдельно, SessionView),
+    поэтому их могут хранить общие кэши (CDN, прокси) с проверкой актуальности по ETag
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Ошибка настройки обнаруживается при загрузке URLconf, а не при первом запросе
+        if cls.get_etag is ConditionalGetMixin.get_etag:
+            raise ImproperlyConfigured(f"{cls.__name__} is missing an ETag. Override {cls.__name__}.get_etag().")
+        return super().as_view(**initkwargs)
+
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        view = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)(super().dispatch)
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class RecipeListConditionalMixin(ConditionalGetMixin):
+    """
+    Условные GET-запросы для списков рецептов: версии списков, категорий и авторов меняются
+    при изменении рецептов, категорий, имен и аватарок авторов и хранятся в кэше,
+    поэтому проверка не обращается к БД
+    """
+
+    versions = None
+
+    def get_versions(self):
+        # Версии читаются одним запросом к кэшу и используются для ETag и Last-Modified
+        if self.versions is None:
+            keys = [RECIPES_VERSION_KEY, CATEGORIES_VERSION_KEY, AUTHORS_VERSION_KEY]
+            versions = get_versions(keys)
+            self.versions = [versions[key] for key in keys]
+        return self.versions
+
+    def get_etag(self, request, *args, **kwargs):
+        return make_etag(request.get_full_path(), *self.get_versions())
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return version_to_datetime(max(self.get_versions()))
+
+
+class RecipeDetailConditionalMixin(ConditionalGetMixin):
+    """
+    Условные GET-запросы для страницы рецепта: дата изменения берется из закэшированного
+    рецепта (webapp/object_cache.py), который затем используется и для отрисовки страницы
+    """
+
+    updated_date = None
+    versions = None
+
+    def get_updated_date(self, request, *args, **kwargs):
+        # Экземпляр представления создается на каждый запрос, дата запрашивается один раз
+        if self.updated_date is None:
+            recipe = get_recipe(kwargs.get('pk'))
+            self.updated_date = recipe.updated_date if recipe else None
+        return self.updated_date
+
+    def get_versions(self, request, *args, **kwargs):
+        # Версия рецепта меняется и при изменении имени или аватарки автора (webapp/cache.py)
+        if self.versions is None:
+            keys = [RECIPE_VERSION_KEY.format(id=kwargs.get('pk')), CATEGORIES_VERSION_KEY]
+            versions = get_versions(keys)
+            self.versions = [versions[key] for key in keys]
+        return self.versions
+
+    def get_etag(self, request, *args, **kwargs):
+        updated_date = self.get_updated_date(request, *args, **kwargs)
+        if updated_date is None:
+            return None
+        return make_etag(kwargs.get('pk'), updated_date.isoformat(), *self.get_versions(request, *args, **kwargs))
+
+    def get_last_modified(self, request, *args, **kwargs):
+        updated_date = self.get_updated_date(request, *args, **kwargs)
+        if updated_date is None:
+            return None
+        return max(updated_date, version_to_datetime(max(self.get_versions(request, *args, **kwargs))))
@@ -0,0 +1,8 @@
+from .cache import get_categories
+
+
+def categories(request):
+    """
+    Переменная 'categories' для меню категорий рецептов на всех страницах сайта
+    """
+    return {'categories': get_categories()}
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.contrib.auth.models import User
+from .cache import invalidate_categories, invalidate_pages
+from .models import AuthorStats, Category, Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Денормализованные счетчики опубликованных (active) рецептов категорий и авторов.
+Счетчики обновляются сигналами в транзакции сохранения или удаления рецепта, поэтому
+страницам не нужны запросы COUNT(*). Изменения рецептов через QuerySet.update()
+счетчики не обновляют, для их пересчета есть команда recount_recipes
+"""
+
+
+def counted_recipe(active, category_id, author_id):
+    """
+    Категория и автор, в счетчиках которых учитывается рецепт, или None для неопубликованного
+    """
+    return (category_id, author_id) if active else None
+
+
+def change_category_count(category_id, delta):
+    Category.objects.filter(pk=category_id).update(recipes_count=Greatest(F('recipes_count') + delta, 0))
+    # Количество рецептов показывается в меню категорий на всех страницах
+    transaction.on_commit(invalidate_categories)
+
+
+def change_author_count(author_id, delta):
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if not stats.update(recipes_count=Greatest(F('recipes_count') + delta, 0)) and delta > 0:
+        # Первый опубликованный рецепт автора
+        AuthorStats.objects.bulk_create([AuthorStats(author_id=author_id)], ignore_conflicts=True)
+        stats.update(recipes_count=F('recipes_count') + delta)
+
+
+def update_recipe_counters(old, new):
+    """
+    Обновление счетчиков при изменении рецепта: old и new - категория и автор рецепта
+    до и после изменения (counted_recipe). Меняются только затронутые счетчики
+    """
+    for index, change_count in enumerate((change_category_count, change_author_count)):
+        old_id = old[index] if old else None
+        new_id = new[index] if new else None
+        if old_id == new_id:
+            continue
+        if old_id:
+            change_count(old_id, -1)
+        if new_id:
+            change_count(new_id, 1)
+
+
+def recount_recipe_counters(batch_size=1000):
+    """
+    Пересчет всех счетчиков по таблице рецептов. Возвращает количество исправленных
+    счетчиков категорий и авторов
+    """
+    published = Recipe.objects.filter(active=True).order_by()
+
+    def actual(field):
+        return Coalesce(Subquery(published.filter(**{field: OuterRef('pk')}).values(field)
+                                 .annotate(count=Count('pk')).values('count')), 0)
+
+    with transaction.atomic():
+        categories = (Category.objects.exclude(recipes_count=actual('category'))
+                      .update(recipes_count=actual('category')))
+
+        # Записи статистики для авторов, у которых их еще нет
+        missing = (User.objects.filter(recipe_stats__isnull=True, pk__in=published.values('author'))
+                   .values_list('pk', flat=True))
+        batch = []
+        for author_id in missing.iterator(chunk_size=batch_size):
+            batch.append(AuthorStats(author_id=author_id))
+            if len(batch) >= batch_size:
+                AuthorStats.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        AuthorStats.objects.bulk_create(batch, ignore_conflicts=True)
+
+        authors = (AuthorStats.objects.exclude(recipes_count=actual('author'))
+                   .update(recipes_count=actual('author')))
+
+    if categories:
+        transaction.on_commit(invalidate_categories)
+    if authors:
+        # Количество рецептов показывается на страницах авторов
+        transaction.on_commit(invalidate_pages)
+    return categories, authors
@@ -0,0 +1,246 @@
+import base64
+import os
+from datetime import timedelta
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import features
+from imagekit.processors import ProcessorPipeline, ResizeToFit, Transpose
+from pilkit.utils import open_image, process_image
+from .models import FALLBACK_IMAGE_FORMAT, RECIPE_IMAGE_WIDTHS, ImageJob, ImageStatus, Recipe
+from .cache import invalidate_recipe, invalidate_recipe_pages, invalidate_recipes
+from .storage import hash_from_name
+from .uploads import draft_image, image_too_large
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Фоновая обработка загруженных изображений рецептов. Задания хранятся в таблице ImageJob
+и выполняются командой process_images, веб-запрос только сохраняет исходный файл
+"""
+
+# Обработка изображения блюда (раньше выполнялась полем ProcessedImageField при сохранении формы).
+# Небольшие изображения не увеличиваются, иначе копии для srcset не отличались бы от исходного файла
+RECIPE_IMAGE_SIZE = (1024, 768)
+RECIPE_IMAGE_PROCESSORS = [Transpose(), ResizeToFit(*RECIPE_IMAGE_SIZE, upscale=False)]
+
+# Форматы копий изображения: {формат: (формат Pillow, параметры сохранения)}. JPEG - основной
+# формат для всех браузеров, WebP и AVIF при том же качестве заметно меньше по размеру.
+# AVIF сохраняется, только если сборка Pillow поддерживает этот формат
+IMAGE_FORMATS = {
+    FALLBACK_IMAGE_FORMAT: ('JPEG', {'quality': 90}),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+}
+if features.check('avif'):
+    IMAGE_FORMATS['avif'] = ('AVIF', {'quality': 60})
+
+# Количество попыток обработки, после которого задание считается невыполнимым
+MAX_ATTEMPTS = 3
+
+# Ширина превью, встраиваемого в страницу (около 300 байт в JPEG)
+PLACEHOLDER_WIDTH = 16
+
+
+def claim_job():
+    """
+    Выбор следующего задания из очереди. Задание переводится в статус RUNNING условным
+    UPDATE, поэтому одно задание не достанется двум обработчикам одновременно
+    """
+    candidates = (ImageJob.objects.filter(status=ImageJob.Status.PENDING)
+                  .order_by('pk').values_list('pk', flat=True)[:10])
+    for pk in candidates:
+        claimed = (ImageJob.objects.filter(pk=pk, status=ImageJob.Status.PENDING)
+                   .update(status=ImageJob.Status.RUNNING, attempts=F('attempts') + 1,
+                           started_date=timezone.now()))
+        if claimed:
+            return ImageJob.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Возврат в очередь заданий, обработчик которых завершился, не закончив работу
+    """
+    return (ImageJob.objects.filter(status=ImageJob.Status.RUNNING,
+                                    started_date__lt=timezone.now() - timedelta(seconds=timeout))
+            .update(status=ImageJob.Status.PENDING))
+
+
+def processed_image_name(source, width=None, image_format=FALLBACK_IMAGE_FORMAT):
+    base = os.path.splitext(source)[0]
+    extension = 'jpg' if image_format == FALLBACK_IMAGE_FORMAT else image_format
+    return f'{base}_{width}w.{extension}' if width else f'{base}.{extension}'
+
+
+def save_image(image, name, image_format=FALLBACK_IMAGE_FORMAT):
+    pil_format, options = IMAGE_FORMATS[image_format]
+    output = process_image(image, format=pil_format, options=options)
+    return default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def make_placeholder(image):
+    """
+    Крошечное превью изображения в виде data URI (LQIP). Превью встраивается в разметку как фон
+    изображения и растягивается браузером, поэтому до загрузки изображения видна его размытая копия
+    """
+    preview = image.convert('RGB')
+    preview.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+    buffer = BytesIO()
+    preview.save(buffer, 'JPEG', quality=40, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def process_recipe_image(recipe_id, source):
+    """
+    Уменьшение исходного изображения рецепта, создание копий для srcset (RECIPE_IMAGE_WIDTHS)
+    во всех форматах IMAGE_FORMATS и замена исходного файла обработанным
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id, image=source).values('image_status', 'image_variants').first()
+    if recipe is None:
+        # Изображение заменено или рецепт удален до начала обработки, исходный файл уже удален
+        return
+    if recipe['image_status'] == ImageStatus.READY and recipe['image_variants']:
+        # Изображение уже обработано (задания миграции 0016): создаются только недостающие форматы
+        add_missing_formats(recipe_id, source, recipe['image_variants'])
+        return
+
+    source_hash = hash_from_name(source)
+    if source_hash and reuse_processed_image(recipe_id, source, source_hash):
+        return
+
+    with default_storage.open(source) as file:
+        image = open_image(file)
+        # Размеры проверяются по заголовку и для файлов, загруженных не через форму (админка, API)
+        if image_too_large(*image.size):
+            raise ValueError(f'Image is too large: {image.width}x{image.height}')
+        # JPEG сразу декодируется в масштабе, близком к итоговому: в памяти не оказывается
+        # полноразмерное изображение
+        draft_image(image, *RECIPE_IMAGE_SIZE)
+        image.load()
+    processed = ProcessorPipeline(RECIPE_IMAGE_PROCESSORS).process(image)
+    name = save_image(processed, processed_image_name(source))
+
+    # Копии создаются из обработанного изображения: оно уже повернуто и в несколько раз меньше исходного.
+    # Ключ - фактическая ширина файла, последняя копия - изображение в размере основного
+    sizes = [(width, ResizeToFit(width=width).process(processed))
+             for width in RECIPE_IMAGE_WIDTHS if width < processed.width]
+    sizes.append((processed.width, processed))
+    variants = {image_format: {} for image_format in IMAGE_FORMATS}
+    for width, resized in sizes:
+        full_size = resized is processed
+        for image_format, files in variants.items():
+            if full_size and image_format == FALLBACK_IMAGE_FORMAT:
+                files[str(width)] = name
+                continue
+            variant_name = processed_image_name(source, None if full_size else width, image_format)
+            files[str(width)] = save_image(resized, variant_name, image_format)
+
+    if set_image_status(recipe_id, source, ImageStatus.READY, image=name, image_variants=variants,
+                        image_hash=source_hash, image_width=processed.width, image_height=processed.height,
+                        image_placeholder=make_placeholder(sizes[0][1])):
+        default_storage.delete(source)
+    else:
+        # Рецепт удален или его изображение заменено, пока выполнялось задание
+        for files in variants.values():
+            for variant in set(files.values()):
+                default_storage.delete(variant)
+
+
+def add_missing_formats(recipe_id, source, variants):
+    """
+    Создание копий в форматах IMAGE_FORMATS, которых еще нет у обработанного изображения.
+    Копии создаются из готовых копий JPEG той же ширины, основное изображение и копии JPEG
+    не перекодируются повторно (без потери качества) и остаются прежними файлами
+    """
+    jpeg_files = variants.get(FALLBACK_IMAGE_FORMAT, {})
+    missing = [image_format for image_format in IMAGE_FORMATS if image_format not in variants]
+    if not jpeg_files or not missing:
+        return
+
+    full_width = max(jpeg_files, key=int)
+    added = {image_format: {} for image_format in missing}
+    for width, jpeg_name in jpeg_files.items():
+        with default_storage.open(jpeg_name) as file:
+            image = open_image(file)
+            image.load()
+        for image_format, files in added.items():
+            variant_name = processed_image_name(source, None if width == full_width else width, image_format)
+            files[width] = save_image(image, variant_name, image_format)
+
+    if not set_image_status(recipe_id, source, ImageStatus.READY, image_variants={**variants, **added}):
+        for files in added.values():
+            for variant in set(files.values()):
+                default_storage.delete(variant)
+
+
+def image_file_names(image, variants):
+    return {image} | {name for files in variants.values() for name in files.values()}
+
+
+def reuse_processed_image(recipe_id, source, source_hash):
+    """
+    Если такое же изображение уже загружено и обработано для другого рецепта, рецепт
+    использует его файлы (с увеличением количества ссылок на них) без повторной обработки
+    """
+    processed = (Recipe.objects.filter(image_hash=source_hash, image_status=ImageStatus.READY)
+                 .exclude(pk=recipe_id).exclude(image_variants={})
+                 .values('image', 'image_variants', 'image_width', 'image_height', 'image_placeholder').first())
+    if processed is None:
+        return False
+
+    names = image_file_names(processed['image'], processed['image_variants'])
+    retained = [name for name in names if default_storage.retain(name)]
+    if len(retained) < len(names):
+        # Рецепт с этими файлами удален во время проверки, изображение обрабатывается заново
+        for name in retained:
+            default_storage.delete(name)
+        return False
+
+    if set_image_status(recipe_id, source, ImageStatus.READY, image_hash=source_hash, **processed):
+        default_storage.delete(source)
+    else:
+        for name in names:
+            default_storage.delete(name)
+    return True
+
+
+def set_image_status(recipe_id, source, status, **fields):
+    """
+    Обновление изображения рецепта, если оно не было заменено после создания задания.
+    Страницы рецепта меняются (заглушка заменяется изображением), поэтому обновляется
+    дата изменения рецепта, версия списков рецептов, закэшированный рецепт и страницы с ним
+    """
+    with transaction.atomic():
+        updated = (Recipe.objects.filter(pk=recipe_id, image=source)
+                   .update(image_status=status, updated_date=timezone.now(), **fields))
+        if updated:
+            transaction.on_commit(invalidate_recipes)
+            transaction.on_commit(lambda: invalidate_recipe(recipe_id))
+            category_id, author_id = (Recipe.objects.filter(pk=recipe_id)
+                                      .values_list('category_id', 'author_id').first())
+            transaction.on_commit(lambda: invalidate_recipe_pages(recipe_id, [category_id], [author_id]))
+    return updated
+
+
+def run_job(job):
+    """
+    Выполнение задания. При ошибке задание возвращается в очередь, пока не исчерпаны попытки
+    """
+    try:
+        process_recipe_image(job.recipe_id, job.source)
+        job.status = ImageJob.Status.DONE
+        job.error = ''
+    except Exception as e:
+        logger.error(f"An error occurred while processing image {job.source}: {str(e)}")
+        job.error = str(e)
+        job.status = ImageJob.Status.FAILED if job.attempts >= MAX_ATTEMPTS else ImageJob.Status.PENDING
+        if job.status == ImageJob.Status.FAILED:
+            set_image_status(job.recipe_id, job.source, ImageStatus.FAILED)
+    job.finished_date = timezone.now()
+    # Рецепт (и задание вместе с ним) мог быть удален во время обработки
+    ImageJob.objects.filter(pk=job.pk).update(status=job.status, error=job.error, finished_date=job.finished_date)
+    return job
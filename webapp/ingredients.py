@@ -0,0 +1,87 @@
+import re
+from django.db.models import Count
+from .models import Ingredient, Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Разделители ингредиентов в тексте рецепта
+SEPARATORS_RE = re.compile(r'[,;\n\r]+')
+# Пояснения в скобках и количество после тире/двоеточия ("мука - 200 г", "сахар: 1 ст.")
+DETAILS_RE = re.compile(r'\([^)]*\)|\s[-–—:]\s.*$|:.*$')
+WORD_RE = re.compile(r'[a-zа-я]+(?:-[a-zа-я]+)*')
+
+# Единицы измерения и служебные слова, которые не входят в название ингредиента
+SKIP_WORDS = {
+    'кг', 'г', 'гр', 'грамм', 'грамма', 'граммов', 'мг', 'л', 'мл', 'литр', 'литра', 'литров',
+    'шт', 'штука', 'штуки', 'штук', 'ст', 'ч', 'стакан', 'стакана', 'стаканов',
+    'ложка', 'ложки', 'ложек', 'столовая', 'столовые', 'столовых', 'чайная', 'чайные', 'чайных',
+    'зубчик', 'зубчика', 'зубчиков', 'щепотка', 'щепотки', 'пучок', 'пучка', 'по', 'вкусу',
+}
+
+MAX_NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+
+
+def normalize_ingredient(text):
+    """
+    Нормализация названия ингредиента: нижний регистр, 'ё' -> 'е',
+    без количества, единиц измерения и пояснений в скобках
+    """
+    text = DETAILS_RE.sub('', text.lower().replace('ё', 'е').strip())
+    words = [word for word in WORD_RE.findall(text) if word not in SKIP_WORDS]
+    return ' '.join(words)[:MAX_NAME_LENGTH]
+
+
+def parse_ingredients(text):
+    """
+    Список уникальных нормализованных названий ингредиентов из текста рецепта
+    с сохранением порядка
+    """
+    names = (normalize_ingredient(part) for part in SEPARATORS_RE.split(text or ''))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def sync_recipes_ingredients(recipes):
+    """
+    Обновление связей рецептов с таблицей Ingredient по тексту поля ingredients.
+    Все рецепты пакета обрабатываются фиксированным числом запросов
+    """
+    recipes = list(recipes)
+    if not recipes:
+        return
+    names_by_recipe = {recipe.pk: parse_ingredients(recipe.ingredients) for recipe in recipes}
+    all_names = {name for names in names_by_recipe.values() for name in names}
+
+    Ingredient.objects.bulk_create([Ingredient(name=name) for name in all_names], ignore_conflicts=True)
+    ids_by_name = dict(Ingredient.objects.filter(name__in=all_names).values_list('name', 'id'))
+
+    through = Recipe.ingredient_items.through
+    through.objects.filter(recipe_id__in=names_by_recipe.keys()).delete()
+    through.objects.bulk_create([
+        through(recipe_id=recipe_id, ingredient_id=ids_by_name[name])
+        for recipe_id, names in names_by_recipe.items()
+        for name in names
+    ])
+
+
+def sync_recipe_ingredients(recipe):
+    sync_recipes_ingredients([recipe])
+
+
+def recipes_with_ingredients(names, match_all=True, queryset=None):
+    """
+    Рецепты, в которых есть все (match_all=True) или хотя бы один из переданных ингредиентов.
+    Поиск выполняется по индексам связующей таблицы, а не по тексту рецептов
+    """
+    if queryset is None:
+        queryset = Recipe.objects.cards()
+    names = list(dict.fromkeys(filter(None, (normalize_ingredient(name) for name in names))))
+    if not names:
+        return queryset.none()
+
+    links = Recipe.ingredient_items.through.objects.filter(ingredient__name__in=names)
+    if match_all:
+        links = (links.values('recipe_id')
+                 .annotate(matched=Count('ingredient_id'))
+                 .filter(matched=len(names)))
+    return queryset.filter(pk__in=links.values('recipe_id')).order_by('-created_date', '-id')
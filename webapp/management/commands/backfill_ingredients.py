@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from webapp.models import Recipe
+from webapp.ingredients import sync_recipes_ingredients
+
+
+class Command(BaseCommand):
+    """
+    Заполнение таблицы ингредиентов по тексту существующих рецептов пакетами
+    """
+    help = 'Заполняет нормализованный список ингредиентов для существующих рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Количество рецептов, обрабатываемых в одной транзакции')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        processed = 0
+
+        while True:
+            batch = list(Recipe.objects.filter(pk__gt=last_pk)
+                         .order_by('pk')
+                         .only('pk', 'ingredients')[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                sync_recipes_ingredients(batch)
+            last_pk = batch[-1].pk
+            processed += len(batch)
+            self.stdout.write(f'Обработано рецептов: {processed}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, обработано рецептов: {processed}'))
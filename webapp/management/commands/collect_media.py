@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from webapp.cleanup import delete_orphan, referenced_media, scan_media
+
+
+class Command(BaseCommand):
+    """
+    Удаление медиафайлов, на которые не ссылается ни один рецепт, профиль или задание обработки.
+    Медиакаталог обходится потоково и сравнивается со списком используемых файлов, загруженным
+    из БД частями. Файлы удаляются пулом потоков с ограничением скорости.
+    Проверка без удаления: python manage.py collect_media --dry-run
+    """
+    help = 'Удаляет неиспользуемые медиафайлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только вывести неиспользуемые файлы, не удаляя их')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Количество потоков удаления')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Максимальное количество удалений в секунду (0 - без ограничения)')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Файлы, измененные менее указанного количества секунд назад, не удаляются')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Количество объектов, загружаемых из БД за один запрос')
+        parser.add_argument('--progress', type=int, default=1000,
+                            help='Выводить ход проверки через указанное количество файлов')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+        progress = options['progress']
+        self.lock = threading.Lock()
+        self.deleted = 0
+
+        referenced = referenced_media(options['batch_size'])
+        self.stdout.write(f'Используемых файлов: {len(referenced)}')
+
+        workers = max(options['workers'], 1)
+        # Ограниченная очередь: список неиспользуемых файлов не накапливается в памяти
+        names = queue.Queue(maxsize=workers * 2)
+        threads = [] if dry_run or workers == 1 else [
+            threading.Thread(target=self.work, args=(names,), daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        min_mtime = time.time() - options['min_age']
+        next_delete = time.monotonic()
+        scanned = orphans = 0
+        for name, mtime in scan_media():
+            scanned += 1
+            if progress and scanned % progress == 0:
+                self.stdout.write(f'Проверено файлов: {scanned}, неиспользуемых: {orphans}, '
+                                  f'удалено: {self.deleted}')
+            # Недавно измененные файлы пропускаются: загрузка могла еще не завершиться
+            if name in referenced or mtime >= min_mtime:
+                continue
+            orphans += 1
+            if dry_run:
+                self.stdout.write(name)
+                continue
+            if interval:
+                # Ограничение скорости: удаления распределяются равномерно во времени
+                now = time.monotonic()
+                next_delete = max(next_delete + interval, now)
+                time.sleep(next_delete - now)
+            if threads:
+                names.put(name)
+            else:
+                self.delete(name)
+
+        for thread in threads:
+            names.put(None)
+        for thread in threads:
+            thread.join()
+
+        result = f'найдено неиспользуемых: {orphans}' if dry_run else f'удалено неиспользуемых: {self.deleted}'
+        self.stdout.write(self.style.SUCCESS(f'Готово, проверено файлов: {scanned}, {result}'))
+
+    def work(self, names):
+        try:
+            while (name := names.get()) is not None:
+                self.delete(name)
+        finally:
+            # У каждого потока собственное соединение с БД
+            connection.close()
+
+    def delete(self, name):
+        try:
+            if delete_orphan(name):
+                with self.lock:
+                    self.deleted += 1
+                self.stdout.write(f'{name}: удален')
+        except Exception as e:
+            self.stderr.write(f'{name}: {e}')
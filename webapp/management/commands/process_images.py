@@ -0,0 +1,82 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from webapp.images import claim_job, requeue_stale_jobs, run_job
+from webapp.storage import release_deferred
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди заданий ImageJob: пул потоков, каждый из которых выбирает задания
+    из таблицы в БД (внешний брокер сообщений не нужен). Декодирование и масштабирование
+    изображений в Pillow выполняются без GIL, поэтому потоки обрабатывают файлы параллельно.
+    Перед каждым заданием обработчик освобождает файлы удаленных рецептов и профилей (MediaDeletion).
+    Запуск рядом с веб-сервером: python manage.py process_images --workers 4
+    """
+    help = 'Обрабатывает загруженные изображения рецептов и удаляет освобожденные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Количество потоков обработки')
+        parser.add_argument('--poll-interval', type=float, default=2,
+                            help='Пауза в секундах между проверками пустой очереди')
+        parser.add_argument('--stale-timeout', type=int, default=600,
+                            help='Через сколько секунд незавершенное задание возвращается в очередь')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать задания, которые есть в очереди, и завершить работу')
+
+    def handle(self, *args, **options):
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+        self.stop = threading.Event()
+
+        requeued = requeue_stale_jobs(options['stale_timeout'])
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь заданий: {requeued}')
+
+        workers = max(options['workers'], 1)
+        if workers == 1:
+            processed = self.work()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self.work, thread=True) for _ in range(workers)]
+                try:
+                    processed = sum(future.result() for future in futures)
+                except KeyboardInterrupt:
+                    # Потоки заканчивают текущие задания и завершаются
+                    self.stop.set()
+                    processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, обработано заданий: {processed}'))
+
+    def work(self, thread=False):
+        """
+        Цикл обработчика: выбор задания, обработка, ожидание новых заданий
+        """
+        processed = 0
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                # Файлы освобождаются перед каждым заданием: при постоянной очереди заданий
+                # очередь удаления не должна расти
+                released = release_deferred()
+                if released:
+                    self.stdout.write(f'Освобождено файлов: {released}')
+                job = claim_job()
+                if job is None:
+                    if released:
+                        continue
+                    if self.once:
+                        break
+                    self.stop.wait(self.poll_interval)
+                    continue
+                job = run_job(job)
+                processed += 1
+                self.stdout.write(f'{job.source}: {job.get_status_display()}')
+        finally:
+            # У каждого потока собственное соединение с БД
+            if thread:
+                connection.close()
+        return processed
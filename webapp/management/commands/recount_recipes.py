@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from webapp.counters import recount_recipe_counters
+
+
+class Command(BaseCommand):
+    """
+    Пересчет счетчиков опубликованных рецептов категорий и авторов по таблице рецептов,
+    например после изменения рецептов через QuerySet.update() или восстановления БД
+    """
+    help = 'Пересчитывает количество рецептов категорий и авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество записей статистики авторов, создаваемых одним запросом')
+
+    def handle(self, *args, **options):
+        categories, authors = recount_recipe_counters(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, исправлено счетчиков категорий: {categories}, авторов: {authors}'))
@@ -0,0 +1,106 @@
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from .models import ImageStatus, Recipe
+from .storage import hash_from_name
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Отдача медиафайлов в production: права доступа проверяет Django, а передачу файла
+выполняет веб-сервер (nginx - X-Accel-Redirect, Apache - X-Sendfile), поэтому
+рабочие процессы Python не тратят время на передачу содержимого файлов.
+Способ отдачи задается настройкой MEDIA_SERVE_METHOD, потоковая отдача средствами
+Django (stream) используется при разработке и если веб-сервер не настроен
+"""
+
+SERVE_STREAM = 'stream'
+SERVE_X_ACCEL_REDIRECT = 'x-accel-redirect'
+SERVE_X_SENDFILE = 'x-sendfile'
+
+# Файлы с адресацией по содержимому не изменяются: новое содержимое - новое имя файла
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def media_name(path):
+    """
+    Имя файла в хранилище по пути из URL или None, если путь выходит за пределы MEDIA_ROOT
+    или указывает на скрытый файл
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if not name or name == '.' or any(part.startswith('.') for part in name.split('/')):
+        return None
+    try:
+        safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    return name
+
+
+def is_private_media(name):
+    """
+    Загруженное изображение рецепта, которое еще не обработано (или не прошло обработку), не проверено
+    и доступно только автору рецепта. Возвращает автора рецепта или None для общедоступных файлов.
+    Доступ определяется статусом рецепта, а не заданиями обработки: задания для уже опубликованных
+    изображений (например, создание копий в новых форматах) не закрывают к ним доступ
+    """
+    author_id = None
+    for status, author in Recipe.objects.filter(image=name).values_list('image_status', 'author_id'):
+        if status == ImageStatus.READY:
+            # Тот же файл (одинаковое содержимое) опубликован в другом рецепте
+            return None
+        author_id = author
+    return author_id
+
+
+def can_access_media(request, name):
+    author_id = is_private_media(name)
+    if author_id is None:
+        return True, False
+    return request.user.is_staff or request.user.pk == author_id, True
+
+
+def media_cache_control(name, private=False):
+    if private:
+        return PRIVATE_CACHE_CONTROL
+    if hash_from_name(name):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def media_response(request, name, private=False):
+    """
+    Ответ с файлом: заголовок для веб-сервера (X-Accel-Redirect / X-Sendfile)
+    или потоковая отдача файла частями
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+    method = settings.MEDIA_SERVE_METHOD
+
+    if method == SERVE_X_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    elif method == SERVE_X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = media_cache_control(name, private)
+    return response
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Триггер поддерживает столбец search_vector в актуальном состоянии при вставке и изменении
+# рецепта, веса: заголовок (A) > описание (B) > ингредиенты (C)
+CREATE_SEARCH_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION webapp_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(NEW.ingredients, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER webapp_recipe_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON webapp_recipe
+        FOR EACH ROW EXECUTE FUNCTION webapp_recipe_search_vector_update()
+    """,
+    # Заполнение вектора для уже существующих рецептов (срабатывает триггер)
+    "UPDATE webapp_recipe SET title = title",
+    "CREATE INDEX webapp_recipe_search_vector_gin ON webapp_recipe USING GIN (search_vector)",
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS webapp_recipe_search_vector_gin",
+    "DROP TRIGGER IF EXISTS webapp_recipe_search_vector_trigger ON webapp_recipe",
+    "DROP FUNCTION IF EXISTS webapp_recipe_search_vector_update()",
+]
+
+
+def create_search(apps, schema_editor):
+    # Полнотекстовый индекс доступен только в PostgreSQL
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_SEARCH_SQL:
+            schema_editor.execute(statement, params=None)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_SEARCH_SQL:
+            schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0009_recipe_category_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:05
+
+from django.db import migrations
+
+# GIN-индексы pg_trgm для нечеткого поиска по названию и ингредиентам рецептов
+CREATE_TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX webapp_recipe_title_trgm ON webapp_recipe USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX webapp_recipe_ingredients_trgm ON webapp_recipe USING GIN (ingredients gin_trgm_ops)",
+]
+
+DROP_TRIGRAM_SQL = [
+    "DROP INDEX IF EXISTS webapp_recipe_title_trgm",
+    "DROP INDEX IF EXISTS webapp_recipe_ingredients_trgm",
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Расширение pg_trgm доступно только в PostgreSQL
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_TRIGRAM_SQL:
+            schema_editor.execute(statement, params=None)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_TRIGRAM_SQL:
+            schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
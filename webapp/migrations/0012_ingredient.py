@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0011_recipe_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название ингредиента')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент',
+                'verbose_name_plural': 'Ингредиенты',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_items',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='recipes', to='webapp.ingredient', verbose_name='Список ингредиентов'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:49
+
+from django.db import migrations, models
+
+
+def set_updated_date(apps, schema_editor):
+    # Для существующих рецептов датой изменения считается дата создания
+    Recipe = apps.get_model('webapp', 'Recipe')
+    Recipe.objects.update(updated_date=models.F('created_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0012_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(set_updated_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:53
+
+import django.db.models.deletion
+import django.utils.timezone
+import webapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0013_recipe_updated_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка обработки')], default='ready', editable=False, max_length=10, verbose_name='Состояние обработки изображения'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(upload_to=webapp.models.user_directory_path, verbose_name='Изображение блюда'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходный файл')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Количество попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('started_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата начала обработки')),
+                ('finished_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата окончания обработки')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='webapp.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Задание обработки изображения',
+                'verbose_name_plural': 'Задания обработки изображений',
+                'indexes': [models.Index(fields=['status', 'id'], name='imagejob_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+def enqueue_existing_images(apps, schema_editor):
+    # Уменьшенные копии существующих изображений создаются командой process_images,
+    # до этого в списках показывается основное изображение
+    Recipe = apps.get_model('webapp', 'Recipe')
+    ImageJob = apps.get_model('webapp', 'ImageJob')
+    recipes = Recipe.objects.exclude(image='').values_list('pk', 'image').iterator()
+    ImageJob.objects.bulk_create((ImageJob(recipe_id=pk, source=image) for pk, image in recipes), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0014_recipe_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии изображения'),
+        ),
+        migrations.RunPython(enqueue_existing_images, migrations.RunPython.noop),
+    ]
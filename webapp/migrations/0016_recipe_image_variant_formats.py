@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def group_variants_by_format(apps, schema_editor):
+    # Копии изображения хранятся по форматам: {формат: {ширина: имя файла}}. Существующие
+    # копии в формате JPEG переносятся, для создания копий в WebP и AVIF добавляются задания обработки.
+    # Задание для уже обработанного изображения создает только недостающие форматы из копий JPEG
+    # (см. webapp/images.py), основное изображение и копии JPEG не перекодируются
+    Recipe = apps.get_model('webapp', 'Recipe')
+    ImageJob = apps.get_model('webapp', 'ImageJob')
+    queued = set(ImageJob.objects.filter(status='pending').values_list('recipe_id', flat=True))
+    jobs = []
+    for recipe in Recipe.objects.exclude(image_variants={}).only('pk', 'image', 'image_variants').iterator():
+        recipe.image_variants = {'jpeg': recipe.image_variants}
+        recipe.save(update_fields=['image_variants'])
+        if recipe.pk not in queued:
+            jobs.append(ImageJob(recipe_id=recipe.pk, source=recipe.image.name))
+    ImageJob.objects.bulk_create(jobs, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0015_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(group_variants_by_format, migrations.RunPython.noop),
+    ]
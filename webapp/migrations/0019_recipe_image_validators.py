@@ -0,0 +1,20 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:16
+
+import webapp.models
+import webapp.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0018_media_deletions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(upload_to=webapp.models.user_directory_path, validators=[webapp.uploads.validate_image_upload], verbose_name='Изображение блюда'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:19
+
+import base64
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_placeholders(apps, schema_editor):
+    # Размеры и превью уже обработанных изображений: превью строится по самой маленькой
+    # копии JPEG, размеры читаются из заголовка основного изображения
+    Recipe = apps.get_model('webapp', 'Recipe')
+    recipes = Recipe.objects.filter(image_status='ready').exclude(image_variants={})
+    for recipe in recipes.only('pk', 'image', 'image_variants').iterator():
+        files = recipe.image_variants.get('jpeg')
+        if not files:
+            continue
+        try:
+            with default_storage.open(recipe.image.name) as file, Image.open(file) as image:
+                width, height = image.size
+            with default_storage.open(files[min(files, key=int)]) as file, Image.open(file) as image:
+                preview = image.convert('RGB')
+            preview.thumbnail((16, 16))
+            buffer = BytesIO()
+            preview.save(buffer, 'JPEG', quality=40, optimize=True)
+        except (OSError, ValueError):
+            continue
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_width=width, image_height=height,
+            image_placeholder='data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webapp', '0019_recipe_image_validators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Превью изображения'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.RunPython(fill_image_placeholders, migrations.RunPython.noop),
+    ]
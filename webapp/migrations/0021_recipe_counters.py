@@ -0,0 +1,50 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_recipe_counters(apps, schema_editor):
+    # Начальные значения счетчиков опубликованных рецептов категорий и авторов
+    Recipe = apps.get_model('webapp', 'Recipe')
+    Category = apps.get_model('webapp', 'Category')
+    AuthorStats = apps.get_model('webapp', 'AuthorStats')
+    published = Recipe.objects.filter(active=True).order_by()
+    Category.objects.update(recipes_count=Coalesce(Subquery(
+        published.filter(category=OuterRef('pk')).values('category')
+        .annotate(count=Count('pk')).values('count')), 0))
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=row['author'], recipes_count=row['count'])
+         for row in published.values('author').annotate(count=Count('pk'))],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('webapp', '0020_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Количество рецептов')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(fill_recipe_counters, migrations.RunPython.noop),
+    ]
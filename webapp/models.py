@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from django.core.files.storage import default_storage
-from imagekit.models import ProcessedImageField, ImageSpecField
-from imagekit.processors import ResizeToFit
+from .tracking import ChangeTrackingMixin
+from .storage import defer_delete
+from .uploads import validate_image_upload
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 class Category(models.Model):
     name = models.CharField(max_length=100, blank=False, verbose_name="Название категории")
+    # Количество опубликованных (active) рецептов категории, обновляется вместе
+    # с рецептами (webapp/counters.py)
+    recipes_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество рецептов")
 
     class Meta:
         verbose_name = 'Категория рецептов'
@@ -20,6 +25,101 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Счетчик обновляется только запросами UPDATE (webapp/counters.py), сохранение категории
+        # (например, в админке) не должно перезаписывать его значением, загруженным ранее
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'recipes_count']
+        super().save(*args, **kwargs)
+
+
+class AuthorStats(models.Model):
+    """
+    Статистика автора: количество опубликованных (active) рецептов, обновляется вместе
+    с рецептами (webapp/counters.py). Запись создается при публикации первого рецепта
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='recipe_stats',
+                                  verbose_name="Автор")
+    recipes_count = models.PositiveIntegerField(default=0, verbose_name="Количество рецептов")
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author}: {self.recipes_count}'
+
+
+class MediaFile(models.Model):
+    """
+    Файл хранилища с адресацией по содержимому (webapp/storage.py) и количество ссылок на него
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name="Имя файла")
+    references = models.PositiveIntegerField(default=1, verbose_name="Количество ссылок")
+    created_date = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
+
+
+class MediaDeletion(models.Model):
+    """
+    Отложенное освобождение файла хранилища. Запись создается в транзакции удаления
+    рецепта или профиля, а файлы удаляются фоновым обработчиком (process_images)
+    """
+    name = models.CharField(max_length=255, verbose_name="Имя файла")
+    created_date = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = 'Удаление медиафайла'
+        verbose_name_plural = 'Удаление медиафайлов'
+
+    def __str__(self):
+        return self.name
+
+
+class Ingredient(models.Model):
+    """
+    Нормализованное название ингредиента (нижний регистр, без количества и единиц измерения)
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Название ингредиента")
+
+    class Meta:
+        verbose_name = 'Ингредиент'
+        verbose_name_plural = 'Ингредиенты'
+
+    def __str__(self):
+        return self.name
+
+
+class ImageStatus(models.TextChoices):
+    """
+    Состояние фоновой обработки загруженного изображения (см. webapp/images.py)
+    """
+    PENDING = 'pending', 'Обрабатывается'
+    READY = 'ready', 'Готово'
+    FAILED = 'failed', 'Ошибка обработки'
+
+
+class RecipeQuerySet(models.QuerySet):
+    """
+    Набор запросов модели Recipe с заранее подключенными связанными объектами
+    """
+
+    def detailed(self):
+        # Автор, его профиль и категория загружаются одним запросом через JOIN,
+        # поисковый вектор нужен только базе данных
+        return self.select_related('author', 'author__profile', 'category').defer('search_vector')
+
+    def cards(self):
+        # Для карточек рецептов в списках не загружаем крупные текстовые поля
+        return self.detailed().defer('ingredients', 'cooking_steps')
+
 
 def user_directory_path(instance, filename):
     """
@@ -31,35 +131,120 @@ def user_directory_path(instance, filename):
     return 'users_media/upload/user_{0}/{1}/{2}'.format(instance.author.id, today, filename)
 
 
-class Recipe(models.Model):
+# Ширины уменьшенных копий изображения блюда, создаваемых при обработке загрузки
+# (самая большая совпадает с размером основного изображения)
+RECIPE_IMAGE_WIDTHS = (100, 320, 640, 1024)
+# Копия, которая используется в карточках рецептов браузерами без поддержки srcset
+CARD_IMAGE_WIDTH = 640
+THUMBNAIL_IMAGE_WIDTH = 100
+# Формат копий, который поддерживают все браузеры, и более компактные форматы
+# в порядке предпочтения (элементы <source> тега <picture>)
+FALLBACK_IMAGE_FORMAT = 'jpeg'
+MODERN_IMAGE_FORMATS = ('avif', 'webp')
+
+
+class Recipe(ChangeTrackingMixin, models.Model):
     title = models.CharField(max_length=150, blank=False, verbose_name="Заголовок рецепта")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=False, verbose_name="Категория")
     description = models.TextField(blank=False, verbose_name="Описание рецепта")
     ingredients = models.TextField(blank=False, verbose_name="Ингредиенты")
+    # Ингредиенты, выделенные из текста поля ingredients (см. webapp/ingredients.py)
+    ingredient_items = models.ManyToManyField(Ingredient, blank=True, editable=False, related_name='recipes',
+                                              verbose_name="Список ингредиентов")
     cooking_steps = models.TextField(blank=False, verbose_name="Шаги приготовления")
     cooking_time = models.DurationField(blank=False, verbose_name="Время приготовления (чч:мм:сс)")
-    image = ProcessedImageField(upload_to=user_directory_path,
-                                processors=[ResizeToFit(1024, 768)],
-                                format='JPEG',
-                                options={'quality': 90},
-                                blank=False,
-                                verbose_name="Изображение блюда")
-    # Поле для показа миниатюр изображений блюда, чтобы не загружать изображение полностью
-    image_thumbnail = ImageSpecField(source='image',
-                                     processors=[ResizeToFit(100, 100)],
-                                     format='JPEG',
-                                     options={'quality': 90})
+    # Загруженный файл сохраняется без изменений, уменьшение изображения выполняется
+    # в фоновом процессе (команда process_images), до его окончания показывается заглушка.
+    # Имя файла в хранилище определяется его содержимым (webapp/storage.py)
+    image = models.ImageField(upload_to=user_directory_path, blank=False, validators=[validate_image_upload],
+                              verbose_name="Изображение блюда")
+    image_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY,
+                                    editable=False, verbose_name="Состояние обработки изображения")
+    # Хэш содержимого загруженного файла: повторно загруженное изображение не обрабатывается,
+    # а использует файлы уже обработанного рецепта
+    image_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False,
+                                  verbose_name="Хэш исходного изображения")
+    # Уменьшенные копии изображения {формат: {ширина: имя файла}}, создаются вместе с обработкой
+    # изображения, чтобы в списках рецептов не загружать изображение полностью
+    image_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                      verbose_name="Уменьшенные копии изображения")
+    # Размеры основного изображения и его крошечное превью (data URI), вычисляются при обработке
+    # изображения и выводятся прямо в разметке: место под изображение резервируется до его загрузки,
+    # а вместо пустого места показывается размытое превью
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False,
+                                              verbose_name="Ширина изображения")
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False,
+                                               verbose_name="Высота изображения")
+    image_placeholder = models.TextField(blank=True, editable=False, verbose_name="Превью изображения")
     author = models.ForeignKey(User, on_delete=models.CASCADE, blank=False, verbose_name="Автор рецепта")
     active = models.BooleanField(default=True, verbose_name="Статус активности")
     created_date = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+    updated_date = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    # Поисковый вектор по заголовку, описанию и ингредиентам. В PostgreSQL заполняется
+    # триггером и индексируется GIN-индексом (см. миграцию 0010_recipe_search_vector)
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Поисковый вектор")
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            # Индексы для постраничного вывода лент рецептов по курсору (created_date, id)
+            models.Index(fields=['-created_date', '-id'], name='recipe_feed_idx'),
+            models.Index(fields=['author', '-created_date', '-id'], name='recipe_author_feed_idx'),
+            models.Index(fields=['category', '-created_date', '-id'], name='recipe_category_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def image_ready(self):
+        return self.image_status == ImageStatus.READY
+
+    def image_variant_url(self, width):
+        name = self.image_variants.get(FALLBACK_IMAGE_FORMAT, {}).get(str(width))
+        return default_storage.url(name) if name else self.image.url
+
+    @property
+    def image_card_url(self):
+        return self.image_variant_url(CARD_IMAGE_WIDTH)
+
+    @property
+    def image_thumbnail_url(self):
+        return self.image_variant_url(THUMBNAIL_IMAGE_WIDTH)
+
+    def get_image_srcset(self, image_format=FALLBACK_IMAGE_FORMAT):
+        """
+        Значение атрибута srcset: браузер сам выбирает копию изображения нужной ширины
+        """
+        files = self.image_variants.get(image_format, {})
+        return ', '.join(f'{default_storage.url(name)} {width}w'
+                         for width, name in sorted(files.items(), key=lambda item: int(item[0])))
+
+    @property
+    def image_srcset(self):
+        return self.get_image_srcset()
+
+    @property
+    def image_sources(self):
+        """
+        Элементы <source> тега <picture>: браузер загружает копию в первом поддерживаемом формате
+        """
+        return [{'type': f'image/{image_format}', 'srcset': self.get_image_srcset(image_format)}
+                for image_format in MODERN_IMAGE_FORMATS if image_format in self.image_variants]
+
+    def delete_image_files(self, image=None, variants=None):
+        """
+        Удаление файла изображения и его копий (по умолчанию - текущих). Файлы удаляются
+        фоновым обработчиком после завершения транзакции, а не во время запроса
+        """
+        image = self.image.name if image is None else image
+        variants = self.image_variants if variants is None else variants
+        names = {image} | {name for files in variants.values() for name in files.values()}
+        defer_delete(*names)
+
     def get_absolute_url(self):
         """
         Перенаправление нового пользователя на отдельную страницу с рецептом
@@ -68,24 +253,63 @@ class Recipe(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Перед сохранением объекта, удаляем старое изображение
+        Перед сохранением объекта, удаляем старое изображение. Для нового изображения
+        создается задание на его обработку в фоновом процессе. Старое изображение определяется
+        по значениям полей, загруженным вместе с объектом (ChangeTrackingMixin)
         """
         try:
-            if self.pk:
-                old_recipe = Recipe.objects.get(pk=self.pk)
-                if self.image != old_recipe.image:
-                    old_recipe.image.delete(save=False)
-            super().save(*args, **kwargs)
+            image_changed = bool(self.image) and self.has_changed('image')
+            # Рецепт, задание на обработку изображения и счетчики рецептов (сигнал post_save)
+            # сохраняются в одной транзакции (внутри уже открытой - без точки сохранения)
+            with transaction.atomic(savepoint=False):
+                if image_changed and not self._state.adding:
+                    old_image = self.get_loaded_value('image')
+                    if old_image:
+                        self.delete_image_files(old_image, self.get_loaded_value('image_variants') or {})
+                if image_changed:
+                    self.image_status = ImageStatus.PENDING
+                    self.image_variants = {}
+                    self.image_width = self.image_height = None
+                    self.image_placeholder = ''
+                super().save(*args, **kwargs)
+                if image_changed:
+                    ImageJob.objects.create(recipe=self, source=self.image.name)
         except Exception as e:
             logger.error(f"Error saving recipe (ID: {self.pk}): {str(e)}")
+            raise
 
-    def delete(self, *args, **kwargs):
-        """
-        Переопределение метода delete для удаления изображения при удалении рецепта
-        """
-        try:
-            default_storage.delete(self.image.name)
-            default_storage.delete(self.image_thumbnail.name)
-            super().delete(*args, **kwargs)
-        except Exception as e:
-            logger.error(f"Error deleting recipe (ID: {self.pk}): {str(e)}")
+
+class ImageJob(models.Model):
+    """
+    Задание на обработку загруженного изображения рецепта. Очередь заданий хранится в БД
+    и обрабатывается пулом потоков команды process_images без внешнего брокера сообщений
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнено'
+        FAILED = 'failed', 'Ошибка'
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='image_jobs', verbose_name="Рецепт")
+    # Имя исходного файла: если изображение рецепта заменили до окончания обработки,
+    # результат задания не сохраняется
+    source = models.CharField(max_length=255, verbose_name="Исходный файл")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING,
+                              verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Количество попыток")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_date = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+    started_date = models.DateTimeField(null=True, blank=True, verbose_name="Дата начала обработки")
+    finished_date = models.DateTimeField(null=True, blank=True, verbose_name="Дата окончания обработки")
+
+    class Meta:
+        verbose_name = 'Задание обработки изображения'
+        verbose_name_plural = 'Задания обработки изображений'
+        indexes = [
+            # Выбор следующего задания из очереди
+            models.Index(fields=['status', 'id'], name='imagejob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.get_status_display()})'
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from .cache import CATEGORIES_VERSION_KEY, RECIPE_KEY, RECIPE_LOCK_KEY, RECIPE_VERSION_KEY, get_versions
+from .models import Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Двухуровневый кэш рецептов для страницы рецепта: ограниченный кэш в памяти процесса
+перед общим кэшем Django. Ключ рецепта содержит версии рецепта (в том числе данных его автора)
+и категорий, которые меняются сигналами, поэтому устаревшие записи не используются в обоих уровнях.
+Рецепт, отсутствующий в кэше, загружается из БД одним потоком одного процесса,
+остальные запросы ждут его появления в кэше
+"""
+
+# Время ожидания загрузки рецепта другим процессом (и время жизни блокировки)
+LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+# Отметка об отсутствии рецепта в БД (None означает отсутствие записи в кэше)
+NOT_FOUND = False
+
+
+class LocalCache:
+    """
+    Кэш в памяти процесса ограниченного размера: при переполнении удаляются записи,
+    которые дольше всего не использовались (LRU). Безопасен для использования из нескольких потоков
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_recipes = LocalCache(settings.RECIPE_LOCAL_CACHE_SIZE)
+
+# Блокировки загрузки рецептов потоками процесса по ключам
+_loading = {}
+_loading_lock = threading.Lock()
+
+
+def recipe_key(pk):
+    keys = [RECIPE_VERSION_KEY.format(id=pk), CATEGORIES_VERSION_KEY]
+    versions = get_versions(keys)
+    return RECIPE_KEY.format(id=pk, versions='.'.join(str(versions[key]) for key in keys))
+
+
+def load_recipe(pk):
+    """
+    Рецепт с автором, профилем и категорией из БД
+    """
+    recipe = Recipe.objects.detailed().filter(pk=pk).first()
+    return NOT_FOUND if recipe is None else recipe
+
+
+def get_recipe(pk):
+    """
+    Рецепт для страницы рецепта или None, если он не найден. Объект используется
+    всеми потоками процесса, поэтому изменять его нельзя
+    """
+    key = recipe_key(pk)
+    recipe = local_recipes.get(key)
+    if recipe is None:
+        recipe = load_shared(pk, key)
+        local_recipes.set(key, recipe)
+    return recipe or None
+
+
+def load_shared(pk, key):
+    """
+    Рецепт из общего кэша, а при его отсутствии - из БД. Потоки процесса ждут, пока рецепт
+    загрузит первый из них, процессы - пока его загрузит процесс, получивший блокировку в кэше
+    """
+    with _loading_lock:
+        lock = _loading.setdefault(key, threading.Lock())
+    with lock:
+        try:
+            recipe = local_recipes.get(key)
+            if recipe is None:
+                recipe = cache.get(key)
+            if recipe is None:
+                recipe = load_locked(pk, key)
+            return recipe
+        finally:
+            with _loading_lock:
+                _loading.pop(key, None)
+
+
+def load_locked(pk, key):
+    lock_key = RECIPE_LOCK_KEY.format(id=pk)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Рецепт загружает другой процесс
+        time.sleep(LOCK_POLL_INTERVAL)
+        recipe = cache.get(key)
+        if recipe is not None:
+            return recipe
+        if time.monotonic() >= deadline:
+            logger.warning(f"Timed out waiting for recipe {pk} to be loaded by another process")
+            return load_recipe(pk)
+    try:
+        recipe = cache.get(key)
+        if recipe is None:
+            recipe = load_recipe(pk)
+            cache.set(key, recipe, settings.RECIPE_CACHE_TIMEOUT)
+        return recipe
+    finally:
+        cache.delete(lock_key)
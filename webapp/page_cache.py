@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.http import urlencode
+from .cache import page_cache_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PageCacheMixin:
+    """
+    Кэширование страниц целиком: страница отрисовывается один раз и до изменения показанных
+    на ней данных отдается из кэша без запросов к БД и отрисовки шаблона. Ключ страницы содержит
+    версии групп страниц (get_page_tags), которые меняются сигналами при изменении рецептов
+    (webapp/signals.py). Страница одинакова для всех пользователей: навигационная панель
+    пользователя и сообщения загружаются отдельно (SessionView)
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Без групп страница не сбрасывалась бы при изменении данных
+        if cls.get_page_tags is PageCacheMixin.get_page_tags:
+            raise ImproperlyConfigured(f"{cls.__name__} is missing page tags. Override {cls.__name__}.get_page_tags().")
+        return super().as_view(**initkwargs)
+
+    def get_page_tags(self):
+        return []
+
+    def get_page_query_params(self):
+        # Параметры запроса, от которых зависит страница (курсоры добавляет KeysetPaginationMixin)
+        return getattr(super(), 'get_page_query_params', list)()
+
+    def get_page_cache_path(self, request):
+        """
+        Адрес страницы для ключа кэша: путь и только те параметры, которые использует страница.
+        Посторонние параметры (метки рекламных ссылок и т.п.) не создают новые записи в кэше
+        """
+        params = [(name, request.GET[name]) for name in sorted(self.get_page_query_params()) if name in request.GET]
+        return f'{request.path}?{urlencode(params)}' if params else request.path
+
+    def is_page_cacheable(self, request):
+        return request.method in ('GET', 'HEAD')
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = page_cache_key(self.get_page_cache_path(request), self.get_page_tags())
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            def cache_page(response):
+                cache.set(key, response.content, settings.PAGE_CACHE_TIMEOUT)
+
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(cache_page)
+            else:
+                cache_page(response)
+        return response
@@ -0,0 +1,109 @@
+import base64
+import binascii
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(created_date, pk):
+    """
+    Курсор страницы: дата создания и id рецепта, закодированные в строку для URL
+    """
+    value = f'{created_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Обратное преобразование курсора в пару (created_date, id),
+    для некорректного курсора возвращается None
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_date, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_date), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        logger.warning(f"Invalid page cursor: {cursor}")
+        return None
+
+
+class KeysetPage:
+    """
+    Страница списка рецептов при постраничном выводе по курсору (без COUNT и OFFSET)
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1].created_date, self.object_list[-1].pk)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0].created_date, self.object_list[0].pk)
+        return None
+
+
+class KeysetPaginationMixin:
+    """
+    Постраничный вывод ListView по курсору (created_date, id) в порядке убывания даты.
+    Следующая страница запрашивается параметром ?after=<курсор>, предыдущая - ?before=<курсор>.
+    Запрос использует составной индекс по (created_date, id) и не считает общее число записей
+    """
+    after_kwarg = 'after'
+    before_kwarg = 'before'
+
+    def get_page_query_params(self):
+        return [self.after_kwarg, self.before_kwarg]
+
+    def paginate_queryset(self, queryset, page_size):
+        # Некорректный курсор равносилен отсутствию курсора (первая страница)
+        after = decode_cursor(self.request.GET.get(self.after_kwarg, ''))
+        before = decode_cursor(self.request.GET.get(self.before_kwarg, ''))
+
+        if before:
+            created_date, pk = before
+            rows = list(
+                queryset.filter(created_date__gte=created_date)
+                .exclude(created_date=created_date, id__lte=pk)
+                .order_by('created_date', 'id')[:page_size + 1]
+            )
+            has_previous = len(rows) > page_size
+            object_list = rows[:page_size][::-1]
+            has_next = bool(object_list)
+        else:
+            if after:
+                created_date, pk = after
+                queryset = (queryset.filter(created_date__lte=created_date)
+                            .exclude(created_date=created_date, id__gte=pk))
+            rows = list(queryset.order_by('-created_date', '-id')[:page_size + 1])
+            has_next = len(rows) > page_size
+            object_list = rows[:page_size]
+            has_previous = bool(after)
+
+        page = KeysetPage(object_list, has_next, has_previous)
+        return None, page, object_list, page.has_other_pages()
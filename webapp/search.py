@@ -0,0 +1,139 @@
+import threading
+from functools import reduce
+from operator import and_, or_
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, CharField, F, FloatField, Q, TextField, Value, When
+from rapidfuzz import fuzz, process, utils
+from .models import Recipe
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация полнотекстового поиска PostgreSQL (контент сайта на русском языке)
+SEARCH_CONFIG = 'russian'
+
+# Поля рецепта, по которым выполняется поиск
+SEARCH_FIELDS = ('title', 'description', 'ingredients')
+
+# Минимальная оценка совпадения (0-100) для нечеткого поиска без pg_trgm
+FUZZY_SCORE_CUTOFF = 70
+
+# Lookup trigram_word_similar (оператор %> расширения pg_trgm) без подключения
+# приложения django.contrib.postgres, чтобы проект запускался и без драйвера PostgreSQL
+CharField.register_lookup(TrigramWordSimilar)
+TextField.register_lookup(TrigramWordSimilar)
+
+
+def search_recipes(query, queryset=None):
+    """
+    Поиск рецептов по названию, описанию и ингредиентам с ранжированием результатов.
+    В PostgreSQL используется индексированный столбец search_vector (tsvector),
+    для остальных СУБД (например, SQLite при локальном запуске) - простой поиск по подстроке
+    """
+    if queryset is None:
+        queryset = Recipe.objects.cards()
+    query = (query or '').strip()
+    if not query:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return (queryset.filter(search_vector=search_query)
+                .annotate(rank=SearchRank(F('search_vector'), search_query))
+                .order_by('-rank', '-created_date', '-id'))
+    return _fallback_search(queryset, query)
+
+
+def _fallback_search(queryset, query):
+    """
+    Поиск без полнотекстового индекса: каждое слово запроса должно встречаться
+    хотя бы в одном из полей, совпадения в заголовке ранжируются выше.
+    В SQLite сравнение без учета регистра работает только для латиницы
+    """
+    terms = query.split()
+    condition = reduce(and_, (
+        reduce(or_, (Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS))
+        for term in terms
+    ))
+    title_match = reduce(and_, (Q(title__icontains=term) for term in terms))
+    return (queryset.filter(condition)
+            .annotate(rank=Case(When(title_match, then=Value(1.0)), default=Value(0.5),
+                                output_field=FloatField()))
+            .order_by('-rank', '-created_date', '-id'))
+
+
+class FuzzyIndex:
+    """
+    Индекс значений поля рецептов в памяти процесса для нечеткого поиска (rapidfuzz)
+    на СУБД без расширения pg_trgm. Строится при первом обращении и сбрасывается
+    при изменении рецептов
+    """
+
+    def __init__(self, field, scorer):
+        self.field = field
+        self.scorer = scorer
+        self._choices = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._choices = None
+
+    def choices(self):
+        choices = self._choices
+        if choices is None:
+            with self._lock:
+                choices = self._choices
+                if choices is None:
+                    choices = dict(Recipe.objects.values_list('id', self.field))
+                    self._choices = choices
+        return choices
+
+    def search(self, text, limit):
+        """
+        Список пар (id рецепта, оценка совпадения) по убыванию оценки
+        """
+        matches = process.extract(text, self.choices(), scorer=self.scorer, processor=utils.default_process,
+                                  limit=limit, score_cutoff=FUZZY_SCORE_CUTOFF)
+        return [(pk, score) for _, score, pk in matches]
+
+
+# Для названий важна похожесть целиком, для ингредиентов - вхождение в длинный текст
+FUZZY_INDEXES = {
+    'title': FuzzyIndex('title', fuzz.WRatio),
+    'ingredients': FuzzyIndex('ingredients', fuzz.partial_ratio),
+}
+
+
+def invalidate_fuzzy_indexes():
+    for index in FUZZY_INDEXES.values():
+        index.invalidate()
+
+
+def fuzzy_search_recipes(text, field='title', limit=10, queryset=None):
+    """
+    Нечеткий поиск рецептов по названию или ингредиентам с учетом опечаток.
+    Возвращает список рецептов, упорядоченный по убыванию похожести (атрибут similarity).
+    В PostgreSQL используются GIN-индексы pg_trgm, для остальных СУБД - индекс FuzzyIndex
+    """
+    if queryset is None:
+        queryset = Recipe.objects.cards()
+    text = (text or '').strip()
+    if not text:
+        return []
+
+    if connections[queryset.db].vendor == 'postgresql':
+        return list(queryset.filter(**{f'{field}__trigram_word_similar': text})
+                    .annotate(similarity=TrigramWordSimilarity(text, field))
+                    .order_by('-similarity', '-created_date')[:limit])
+
+    matches = FUZZY_INDEXES[field].search(text, limit)
+    recipes = queryset.in_bulk([pk for pk, _ in matches])
+    result = []
+    for pk, score in matches:
+        if pk in recipes:
+            recipe = recipes[pk]
+            recipe.similarity = score / 100
+            result.append(recipe)
+    return result
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Recipe
+from .cache import invalidate_categories, invalidate_recipe, invalidate_recipe_pages, invalidate_recipes
+from .counters import counted_recipe, update_recipe_counters
+from .search import invalidate_fuzzy_indexes
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Сброс закэшированных данных при добавлении, изменении или удалении категорий и рецептов,
+обновление счетчиков рецептов, освобождение изображений удаленных рецептов
+"""
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories_cache(sender, instance, **kwargs):
+    try:
+        transaction.on_commit(invalidate_categories)
+    except Exception as e:
+        logger.error(f"An error occurred while invalidating categories cache: {str(e)}")
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_caches(sender, instance, **kwargs):
+    try:
+        invalidate_fuzzy_indexes()
+        transaction.on_commit(invalidate_recipes)
+    except Exception as e:
+        logger.error(f"An error occurred while invalidating recipe caches: {str(e)}")
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_pages_cache(sender, instance, created=False, **kwargs):
+    # Сбрасываются только страницы, на которых рецепт показывался или будет показан:
+    # при смене категории или автора - страницы и прежних, и новых
+    try:
+        recipe_id = instance.pk
+        category_ids = {instance.category_id}
+        author_ids = {instance.author_id}
+        if not created:
+            category_ids.add(instance.get_loaded_value('category'))
+            author_ids.add(instance.get_loaded_value('author'))
+        transaction.on_commit(lambda: invalidate_recipe(recipe_id))
+        transaction.on_commit(lambda: invalidate_recipe_pages(recipe_id, category_ids, author_ids))
+    except Exception as e:
+        logger.error(f"An error occurred while invalidating recipe pages cache: {str(e)}")
+
+
+@receiver(post_save, sender=Recipe)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    # Счетчики меняются при публикации и снятии с публикации, смене категории или автора.
+    # Ошибка не перехватывается: сохранение рецепта отменяется вместе со счетчиками
+    old = None if created else counted_recipe(instance.get_loaded_value('active'),
+                                              instance.get_loaded_value('category'),
+                                              instance.get_loaded_value('author'))
+    update_recipe_counters(old, counted_recipe(instance.active, instance.category_id, instance.author_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def update_counters_on_delete(sender, instance, **kwargs):
+    # Удаление выполняется в транзакции вместе с сигналами post_delete, в том числе
+    # при каскадном удалении рецептов категории или пользователя
+    update_recipe_counters(counted_recipe(instance.active, instance.category_id, instance.author_id), None)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_images(sender, instance, **kwargs):
+    # Сигнал отправляется и при удалении рецептов вместе с пользователем (CASCADE),
+    # и при удалении через QuerySet.delete(), в которых метод модели delete не вызывается
+    try:
+        instance.delete_image_files()
+    except Exception as e:
+        logger.error(f"An error occurred while deleting recipe images (ID: {instance.pk}): {str(e)}")
@@ -0,0 +1,26 @@
+// Персональная часть страницы: навигационная панель пользователя и сообщения загружаются
+// отдельным запросом (SessionView), поэтому сама страница одинакова для всех пользователей
+// и может кэшироваться. Кнопки автора рецепта (data-author) показываются только автору
+(function () {
+    var nav = document.getElementById('user-nav');
+    if (!nav || !window.fetch) {
+        return;
+    }
+    fetch(nav.dataset.url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+        .then(function (response) {
+            return response.ok ? response.json() : Promise.reject(response.status);
+        })
+        .then(function (session) {
+            nav.innerHTML = session.nav;
+            document.getElementById('messages').innerHTML = session.messages;
+            if (!session.username) {
+                return;
+            }
+            document.querySelectorAll('[data-author]').forEach(function (element) {
+                if (element.dataset.author === session.username) {
+                    element.classList.remove('d-none');
+                }
+            });
+        })
+        .catch(function () {});
+})();
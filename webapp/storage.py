@@ -0,0 +1,125 @@
+import hashlib
+import os
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Хранилище медиафайлов с адресацией по содержимому: имя файла - хэш SHA-256 его содержимого,
+каталоги разбиты по первым символам хэша (content/ab/cd/<хэш>.jpg), поэтому одинаковые
+файлы хранятся один раз, а число файлов в каталоге ограничено. Количество ссылок
+на файл хранится в таблице MediaFile, файл удаляется с диска, когда ссылок не остается
+"""
+
+# Каталог внутри MEDIA_ROOT для файлов с адресацией по содержимому
+CONTENT_DIR = 'content'
+
+
+def file_hash(content):
+    content.seek(0)
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(digest, extension):
+    return f'{CONTENT_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}'
+
+
+def hash_from_name(name):
+    """
+    Хэш содержимого по имени файла (пустая строка для файлов, сохраненных до перехода на это хранилище)
+    """
+    if not name.startswith(CONTENT_DIR + '/'):
+        return ''
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище с дедупликацией. Путь, переданный при сохранении (upload_to),
+    используется только для расширения файла. Метод delete уменьшает количество ссылок
+    на файл, поэтому файл, общий для нескольких рецептов или профилей, удаляется безопасно
+    """
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaFile
+
+        if content is None:
+            content = name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(file_hash(content), os.path.splitext(name)[1])
+        with transaction.atomic():
+            media_file, created = MediaFile.objects.select_for_update().get_or_create(name=name)
+            if not created:
+                MediaFile.objects.filter(pk=media_file.pk).update(references=F('references') + 1)
+            # Файл с таким содержимым уже может быть на диске, в том числе без записи
+            # в таблице (например, после сбоя), тогда он не перезаписывается
+            if not self.exists(name):
+                saved_name = super()._save(name, content)
+                if saved_name != name:
+                    # Тот же файл одновременно записал другой процесс, копия не нужна
+                    super().delete(saved_name)
+        return name
+
+    def retain(self, name):
+        """
+        Дополнительная ссылка на уже сохраненный файл (файл используется еще одним объектом).
+        Возвращает False, если файла нет в хранилище
+        """
+        from .models import MediaFile
+
+        return bool(MediaFile.objects.filter(name=name).update(references=F('references') + 1))
+
+    def delete(self, name):
+        from .models import MediaFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            media_file = MediaFile.objects.select_for_update().filter(name=name).first()
+            if media_file is not None and media_file.references > 1:
+                MediaFile.objects.filter(pk=media_file.pk).update(references=F('references') - 1)
+                return
+            if media_file is not None:
+                media_file.delete()
+        # Последняя ссылка или файл, сохраненный до перехода на это хранилище
+        super().delete(name)
+
+
+def defer_delete(*names):
+    """
+    Отложенное удаление файлов хранилища: записи в очереди MediaDeletion создаются в текущей
+    транзакции (при ее откате файлы не удаляются), файлы освобождает release_deferred
+    """
+    from .models import MediaDeletion
+
+    MediaDeletion.objects.bulk_create([MediaDeletion(name=name) for name in names if name])
+
+
+def release_deferred(limit=100):
+    """
+    Освобождение файлов из очереди отложенного удаления. Запись удаляется в одной транзакции
+    с освобождением файла, поэтому каждая ссылка освобождается один раз, даже если очередь
+    обрабатывают несколько потоков. Возвращает количество освобожденных файлов
+    """
+    from django.core.files.storage import default_storage
+    from .models import MediaDeletion
+
+    released = 0
+    for pk, name in MediaDeletion.objects.order_by('pk').values_list('pk', 'name')[:limit]:
+        try:
+            with transaction.atomic():
+                if MediaDeletion.objects.filter(pk=pk).delete()[0]:
+                    default_storage.delete(name)
+                    released += 1
+        except Exception as e:
+            logger.error(f"An error occurred while deleting media file {name}: {str(e)}")
+    return released
@@ -0,0 +1,31 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from ..cache import recipe_card_key
+
+register = template.Library()
+
+
+@register.simple_tag
+def recipe_cards(recipes):
+    """
+    Карточки рецептов списка. Готовые карточки загружаются из кэша одним запросом,
+    отрисовываются и сохраняются в кэш только отсутствующие. Первая карточка
+    на странице загружает изображение сразу, остальные - по мере прокрутки
+    """
+    cards = [(recipe, 'lazy' if index else 'eager') for index, recipe in enumerate(recipes)]
+    keys = [recipe_card_key(recipe, loading) for recipe, loading in cards]
+    cached = cache.get_many(keys)
+
+    rendered = {}
+    for key, (recipe, loading) in zip(keys, cards):
+        if key not in cached:
+            rendered[key] = render_to_string('webapp/includes/recipe_card.html',
+                                             {'recipe': recipe, 'loading': loading})
+    if rendered:
+        cache.set_many(rendered, settings.RECIPE_CARD_CACHE_TIMEOUT)
+
+    cached.update(rendered)
+    return mark_safe(''.join(cached[key] for key in keys))
@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from ..models import Category
+from ..cache import get_categories
+
+
+class CategoriesCacheTest(TestCase):
+    """
+    Тестирование кэша меню категорий
+    """
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Test Category')
+
+    def test_categories_cached(self):
+        # Повторное обращение к меню категорий не выполняет запросов к БД
+        self.assertEqual(get_categories(), [self.category])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_categories(), [self.category])
+
+    def test_cache_invalidated_on_save(self):
+        get_categories()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Renamed Category'
+            self.category.save()
+        self.assertEqual(get_categories()[0].name, 'Renamed Category')
+
+    def test_cache_invalidated_on_delete(self):
+        get_categories()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertEqual(get_categories(), [])
+
+    def test_sidebar_rendered_on_user_pages(self):
+        # Меню категорий выводится и на страницах приложения usersapp
+        response = self.client.get(reverse('login'))
+        self.assertContains(response, 'Test Category')
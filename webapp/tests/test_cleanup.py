@@ -0,0 +1,110 @@
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from usersapp.models import DEFAULT_AVATAR
+from ..cleanup import delete_orphan, is_referenced
+from ..models import Category, MediaDeletion, MediaFile, Recipe
+from .test_images import make_image, media_files
+from .utils import TemporaryMediaMixin
+
+
+class CollectMediaTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование отложенного удаления и удаления неиспользуемых медиафайлов
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image=make_image(),
+            author=self.user,
+        )
+
+    def create_file(self, name, content=b'content', age=7200):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def collect_media(self, **options):
+        stdout = StringIO()
+        call_command('collect_media', workers=1, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_queryset_delete_is_deferred(self):
+        self.create_recipe()
+        name = Recipe.objects.get().image.name
+
+        # Удаление через QuerySet не вызывает метод delete модели, файл освобождается фоновым обработчиком
+        Recipe.objects.all().delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(list(MediaDeletion.objects.values_list('name', flat=True)), [name])
+
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaDeletion.objects.exists())
+
+    def test_collect_orphans(self):
+        recipe = self.create_recipe()
+        self.create_file(DEFAULT_AVATAR)
+        self.create_file('users_media/upload/user_1/orphan.jpg')
+        self.create_file('content/ab/cd/orphan.jpg', b'orphan')
+        MediaFile.objects.create(name='content/ab/cd/orphan.jpg')
+        # Файл мог быть только что загружен и еще не сохранен в БД
+        self.create_file('users_media/upload/user_1/new.jpg', age=0)
+
+        output = self.collect_media(dry_run=True)
+        self.assertIn('users_media/upload/user_1/orphan.jpg', output)
+        self.assertIn('найдено неиспользуемых: 2', output)
+        self.assertEqual(len(media_files(self.media_root)), 5)
+
+        output = self.collect_media(progress=1)
+        self.assertIn('удалено неиспользуемых: 2', output)
+        self.assertIn('Проверено файлов: 5', output)
+        self.assertEqual(media_files(self.media_root),
+                         {recipe.image.name, DEFAULT_AVATAR, 'users_media/upload/user_1/new.jpg'})
+        self.assertFalse(MediaFile.objects.filter(name='content/ab/cd/orphan.jpg').exists())
+
+    def test_avatar_variants_are_kept(self):
+        profile = self.user.profile
+        profile.image = make_image()
+        profile.save()
+        names = {profile.image.name, *profile.image_variants.values()}
+        self.assertIn('webp', profile.image_variants)
+
+        self.collect_media(min_age=0)
+        self.assertEqual(media_files(self.media_root), names)
+        for name in profile.image_variants.values():
+            self.assertTrue(is_referenced(name))
+
+    def test_referenced_file_is_kept(self):
+        name = default_storage.save('photo.jpg', ContentFile(b'content'))
+        os.utime(default_storage.path(name), (0, 0))
+        output = self.collect_media()
+        self.assertIn(f'{name}: удален', output)
+
+        # Файл, на который появилась ссылка после загрузки списка используемых файлов, не удаляется
+        name = default_storage.save('photo.jpg', ContentFile(b'content'))
+        os.utime(default_storage.path(name), (0, 0))
+        Recipe.objects.filter(pk=self.create_recipe().pk).update(image_variants={'jpeg': {'100': name}})
+        self.assertFalse(delete_orphan(name))
+        self.assertTrue(default_storage.exists(name))
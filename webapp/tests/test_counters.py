@@ -0,0 +1,133 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.urls import reverse
+from ..models import AuthorStats, Category, ImageJob, Recipe
+
+
+class RecipeCountersTest(TestCase):
+    """
+    Тестирование счетчиков опубликованных рецептов категорий и авторов
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.other_category = Category.objects.create(name='Other Category')
+
+    def create_recipe(self, **fields):
+        values = {
+            'title': 'Test Recipe',
+            'category': self.category,
+            'description': 'Test description',
+            'ingredients': 'Test ingredients',
+            'cooking_steps': 'Test cooking steps',
+            'cooking_time': timedelta(minutes=30),
+            'image': 'recipes_media/test.jpg',
+            'author': self.user,
+        }
+        values.update(fields)
+        return Recipe.objects.create(**values)
+
+    def assert_counts(self, category, other_category, author):
+        self.assertEqual(Category.objects.get(pk=self.category.pk).recipes_count, category)
+        self.assertEqual(Category.objects.get(pk=self.other_category.pk).recipes_count, other_category)
+        self.assertEqual(AuthorStats.objects.get(author=self.user).recipes_count, author)
+
+    def test_create_and_delete(self):
+        recipe = self.create_recipe()
+        self.create_recipe()
+        self.assert_counts(2, 0, 2)
+
+        recipe.delete()
+        self.assert_counts(1, 0, 1)
+
+        # Удаление через QuerySet и каскадное удаление тоже обновляют счетчики
+        Recipe.objects.all().delete()
+        self.assert_counts(0, 0, 0)
+
+    def test_inactive_recipe_not_counted(self):
+        recipe = self.create_recipe(active=False)
+        self.assertEqual(Category.objects.get(pk=self.category.pk).recipes_count, 0)
+        self.assertFalse(AuthorStats.objects.exists())
+
+        recipe.active = True
+        recipe.save()
+        self.assert_counts(1, 0, 1)
+
+        recipe.active = False
+        recipe.save()
+        self.assert_counts(0, 0, 0)
+
+    def test_category_change(self):
+        recipe = self.create_recipe()
+        recipe.category = self.other_category
+        recipe.save()
+        self.assert_counts(0, 1, 1)
+
+    def test_unrelated_change_does_not_update_counters(self):
+        recipe = self.create_recipe()
+        recipe.title = 'Updated Recipe'
+        # Только обновление рецепта
+        with self.assertNumQueries(1):
+            recipe.save()
+
+    def test_failed_save_rolls_back_counters(self):
+        recipe = self.create_recipe()
+        recipe.category = self.other_category
+        recipe.image = 'recipes_media/new.jpg'
+        # Ошибка после обновления счетчиков не скрывается и отменяет всю транзакцию
+        with mock.patch.object(ImageJob.objects, 'create', side_effect=DatabaseError('error')):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                recipe.save()
+        self.assert_counts(1, 0, 1)
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).category, self.category)
+
+    def test_category_save_keeps_count(self):
+        category = Category.objects.get(pk=self.category.pk)
+        self.create_recipe()
+        category.name = 'Renamed Category'
+        category.save()
+        self.assertEqual(Category.objects.get(pk=self.category.pk).recipes_count, 1)
+
+    def test_counts_shown_on_pages(self):
+        self.create_recipe()
+        self.create_recipe(active=False)
+        response = self.client.get(reverse('user-recipes', args=[self.user.username]))
+        self.assertEqual(response.context['recipes_count'], 1)
+        # В списке автора только опубликованные рецепты, как и в счетчике
+        self.assertEqual(len(response.context['recipes']), 1)
+        self.assertContains(response, '<span class="badge badge-secondary badge-pill">1</span>', html=True)
+
+    def test_author_stats_admin_is_read_only(self):
+        self.create_recipe()
+        admin_user = User.objects.create_superuser(username='admin', password='adminpassword')
+        self.client.force_login(admin_user)
+        url = reverse('admin:webapp_authorstats_change', args=[self.user.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="recipes_count"')
+        self.assertNotContains(response, 'name="_save"')
+        self.assert_counts(1, 0, 1)
+
+    def test_recount(self):
+        self.create_recipe()
+        self.create_recipe()
+        # Изменение через QuerySet.update() не обновляет счетчики
+        Recipe.objects.update(category=self.other_category)
+        AuthorStats.objects.all().delete()
+
+        stdout = StringIO()
+        call_command('recount_recipes', stdout=stdout)
+        self.assertIn('исправлено счетчиков категорий: 2, авторов: 1', stdout.getvalue())
+        self.assert_counts(0, 2, 2)
+
+        stdout = StringIO()
+        call_command('recount_recipes', stdout=stdout)
+        self.assertIn('исправлено счетчиков категорий: 0, авторов: 0', stdout.getvalue())
@@ -0,0 +1,235 @@
+import os
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from ..models import Category, ImageJob, ImageStatus, MediaDeletion, MediaFile, Recipe
+from ..images import IMAGE_FORMATS, MAX_ATTEMPTS, claim_job
+from .utils import TemporaryMediaMixin
+
+
+def media_files(root):
+    return {os.path.relpath(os.path.join(path, name), root).replace(os.sep, '/')
+            for path, _, names in os.walk(root) for name in names}
+
+
+def make_image(width=1600, height=1200, name='photo.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageProcessingTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование фоновой обработки изображений рецептов
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image=image,
+            author=self.user,
+        )
+
+    def process_images(self):
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+
+    def test_upload_is_queued(self):
+        recipe = self.create_recipe(make_image())
+        self.assertEqual(recipe.image_status, ImageStatus.PENDING)
+        job = ImageJob.objects.get(recipe=recipe)
+        self.assertEqual(job.source, recipe.image.name)
+        self.assertEqual(job.status, ImageJob.Status.PENDING)
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+        self.assertContains(response, 'webapp/images/processing.svg')
+        self.assertNotContains(response, recipe.image.url)
+
+    def test_process_images(self):
+        recipe = self.create_recipe(make_image())
+        source = recipe.image.name
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_status, ImageStatus.READY)
+        self.assertEqual(ImageJob.objects.get(recipe=recipe).status, ImageJob.Status.DONE)
+        self.assertFalse(default_storage.exists(source))
+        with Image.open(recipe.image.path) as image:
+            self.assertEqual(image.size, (1024, 768))
+
+        response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+        self.assertContains(response, recipe.image.url)
+
+    def test_image_placeholder(self):
+        recipe = self.create_recipe(make_image())
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.image_width, recipe.image_height), (1024, 768))
+        self.assertTrue(recipe.image_placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertLess(len(recipe.image_placeholder), 1000)
+
+        # Размеры и превью выводятся в разметке, изображения в списке загружаются по мере прокрутки
+        response = self.client.get(reverse('webapp-home'))
+        self.assertContains(response, 'width="1024" height="768"')
+        self.assertContains(response, f"url('{recipe.image_placeholder}')")
+        self.assertContains(response, 'loading="eager"')
+
+        # Новое изображение - новые размеры и превью
+        recipe.image = make_image(name='other.jpg')
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertIsNone(recipe.image_width)
+        self.assertEqual(recipe.image_placeholder, '')
+
+    def test_image_variants(self):
+        recipe = self.create_recipe(make_image())
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual(set(recipe.image_variants), set(IMAGE_FORMATS))
+        self.assertEqual(recipe.image_variants['jpeg']['1024'], recipe.image.name)
+        for image_format, files in recipe.image_variants.items():
+            self.assertEqual(set(files), {'100', '320', '640', '1024'})
+            for width, name in files.items():
+                with Image.open(default_storage.path(name)) as image:
+                    self.assertEqual(image.width, int(width))
+                    self.assertEqual(image.format, IMAGE_FORMATS[image_format][0])
+
+        # В списках рецептов используются уменьшенные копии, WebP и AVIF - через <picture>
+        response = self.client.get(reverse('webapp-home'))
+        self.assertContains(response, f'src="{recipe.image_card_url}"')
+        self.assertContains(response, f'{recipe.image_thumbnail_url} 100w')
+        self.assertContains(response, f'{recipe.image.url} 1024w')
+        self.assertContains(response, f'<source type="image/webp" srcset="{recipe.get_image_srcset("webp")}"')
+
+        # При удалении рецепта все копии удаляются фоновым обработчиком
+        names = [name for files in recipe.image_variants.values() for name in files.values()]
+        recipe.delete()
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        self.process_images()
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_missing_formats_are_added(self):
+        # Изображение с шумом: повторное сжатие в JPEG изменило бы файл
+        buffer = BytesIO()
+        Image.effect_noise((400, 300), 64).convert('RGB').save(buffer, 'JPEG')
+        recipe = self.create_recipe(SimpleUploadedFile('noise.jpg', buffer.getvalue(), content_type='image/jpeg'))
+        self.process_images()
+        recipe.refresh_from_db()
+        # Изображение, обработанное до появления WebP и AVIF (задание из миграции 0016)
+        jpeg_files = recipe.image_variants['jpeg']
+        for image_format, files in recipe.image_variants.items():
+            if image_format != 'jpeg':
+                for name in set(files.values()):
+                    default_storage.delete(name)
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants={'jpeg': jpeg_files})
+        ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+        image = recipe.image.name
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_status, ImageStatus.READY)
+        # Основное изображение и копии JPEG не перекодируются
+        self.assertEqual(recipe.image.name, image)
+        self.assertEqual(recipe.image_variants['jpeg'], jpeg_files)
+        self.assertEqual(set(recipe.image_variants), set(IMAGE_FORMATS))
+        for image_format, files in recipe.image_variants.items():
+            self.assertEqual(set(files), set(jpeg_files))
+            for width, name in files.items():
+                with Image.open(default_storage.path(name)) as img:
+                    self.assertEqual((img.width, img.format), (int(width), IMAGE_FORMATS[image_format][0]))
+        names = {name for files in recipe.image_variants.values() for name in files.values()}
+        self.assertEqual(media_files(self.media_root), names)
+
+    def test_files_are_released_before_jobs(self):
+        recipe = self.create_recipe(make_image())
+        self.process_images()
+        recipe.delete()
+        self.create_recipe(make_image(name='other.jpg'))
+
+        # Очередь удаления освобождается и тогда, когда в очереди есть задания
+        pending_deletions = []
+
+        def claim():
+            pending_deletions.append(MediaDeletion.objects.count())
+            return claim_job()
+
+        with mock.patch('webapp.management.commands.process_images.claim_job', side_effect=claim):
+            self.process_images()
+        self.assertEqual(pending_deletions[0], 0)
+
+    def test_small_image_variants(self):
+        recipe = self.create_recipe(make_image(300, 200))
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual(set(recipe.image_variants['webp']), {'100', '300'})
+        self.assertEqual(recipe.image_card_url, recipe.image.url)
+
+    def test_replaced_image_is_not_overwritten(self):
+        recipe = self.create_recipe(make_image())
+        recipe.image = make_image(name='other.jpg')
+        recipe.save()
+        self.process_images()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_status, ImageStatus.READY)
+        self.assertEqual(ImageJob.objects.filter(recipe=recipe, status=ImageJob.Status.DONE).count(), 2)
+        # Остались только файлы нового изображения
+        names = {name for files in recipe.image_variants.values() for name in files.values()}
+        self.assertEqual(media_files(self.media_root), names)
+
+    def test_broken_image_fails(self):
+        recipe = self.create_recipe(SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg'))
+        for _ in range(MAX_ATTEMPTS):
+            self.process_images()
+
+        recipe.refresh_from_db()
+        job = ImageJob.objects.get(recipe=recipe)
+        self.assertEqual(job.status, ImageJob.Status.FAILED)
+        self.assertEqual(job.attempts, MAX_ATTEMPTS)
+        self.assertEqual(recipe.image_status, ImageStatus.FAILED)
+
+    def test_same_image_is_processed_once(self):
+        first = self.create_recipe(make_image())
+        self.process_images()
+        second = self.create_recipe(make_image())
+        with mock.patch('webapp.images.save_image') as save_image:
+            self.process_images()
+        save_image.assert_not_called()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.image_status, ImageStatus.READY)
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(second.image_placeholder, first.image_placeholder)
+        self.assertEqual(MediaFile.objects.get(name=first.image.name).references, 2)
+
+        # Файлы, общие для двух рецептов, удаляются вместе с последним из них
+        first.delete()
+        self.process_images()
+        self.assertTrue(default_storage.exists(second.image.name))
+        second.delete()
+        self.process_images()
+        self.assertEqual(media_files(self.media_root), set())
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from ..models import Category, Ingredient, Recipe
+from ..ingredients import parse_ingredients, recipes_with_ingredients, sync_recipe_ingredients
+
+
+class ParseIngredientsTest(TestCase):
+    """
+    Тестирование разбора текста ингредиентов
+    """
+
+    def test_parse_ingredients(self):
+        text = 'Мука - 200 г, Яйца 2 шт.\nсоль по вкусу; Сахар (белый): 1 стакан, мука'
+        self.assertEqual(parse_ingredients(text), ['мука', 'яйца', 'соль', 'сахар'])
+
+    def test_parse_empty(self):
+        self.assertEqual(parse_ingredients(''), [])
+        self.assertEqual(parse_ingredients(' , 200 г'), [])
+
+
+class RecipeIngredientsTest(TestCase):
+    """
+    Тестирование связей рецептов с нормализованными ингредиентами
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.omelette = self.create_recipe('Омлет', 'яйца, молоко, соль')
+        self.pancakes = self.create_recipe('Блины', 'мука, яйца, молоко, сахар')
+        self.bread = self.create_recipe('Хлеб', 'мука, вода, дрожжи')
+
+    def create_recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(
+            title=title,
+            category=self.category,
+            description='Test description',
+            ingredients=ingredients,
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='path/to/test/image.jpg',
+            author=self.user,
+        )
+        sync_recipe_ingredients(recipe)
+        return recipe
+
+    def test_match_all(self):
+        recipes = recipes_with_ingredients(['Яйца', 'мука'])
+        self.assertEqual(list(recipes), [self.pancakes])
+
+    def test_match_any(self):
+        recipes = recipes_with_ingredients(['яйца', 'вода'], match_all=False)
+        self.assertEqual(set(recipes), {self.omelette, self.pancakes, self.bread})
+
+    def test_ingredients_shared(self):
+        self.assertEqual(Ingredient.objects.filter(name='молоко').count(), 1)
+        self.assertEqual(self.omelette.ingredient_items.count(), 3)
+
+    def test_update_view_syncs_ingredients(self):
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.post(reverse('recipe-update', args=[self.bread.id]), {
+            'title': 'Хлеб',
+            'category': self.category.id,
+            'description': 'Test description',
+            'ingredients': 'мука, вода, соль',
+            'cooking_steps': 'Test cooking steps',
+            'cooking_time': '00:30:00',
+            'active': True,
+        })
+        self.assertEqual(response.status_code, 302)
+        names = set(self.bread.ingredient_items.values_list('name', flat=True))
+        self.assertEqual(names, {'мука', 'вода', 'соль'})
+
+    def test_backfill_command(self):
+        Recipe.ingredient_items.through.objects.all().delete()
+        call_command('backfill_ingredients', batch_size=2, stdout=StringIO())
+        self.assertEqual(list(recipes_with_ingredients(['дрожжи'])), [self.bread])
+        self.assertEqual(self.pancakes.ingredient_items.count(), 4)
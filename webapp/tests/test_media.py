@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from ..models import Category, ImageJob, ImageStatus, Recipe
+from ..media import IMMUTABLE_CACHE_CONTROL, PRIVATE_CACHE_CONTROL
+from .test_images import make_image
+from .utils import TemporaryMediaMixin
+
+
+@override_settings(MEDIA_SERVE_METHOD='stream')
+class MediaViewTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование отдачи медиафайлов с проверкой прав доступа
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.recipe = Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image=make_image(),
+            author=self.user,
+        )
+
+    def process_images(self):
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+        self.recipe.refresh_from_db()
+
+    def test_stream(self):
+        self.process_images()
+        response = self.client.get(self.recipe.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        with default_storage.open(self.recipe.image.name) as image:
+            self.assertEqual(b''.join(response.streaming_content), image.read())
+
+        response = self.client.get(self.recipe.image.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_SERVE_METHOD='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        self.process_images()
+        name = self.recipe.image_variants['webp']['320']
+        response = self.client.get(default_storage.url(name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + name)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_METHOD='x-sendfile')
+    def test_x_sendfile(self):
+        self.process_images()
+        response = self.client.get(self.recipe.image.url)
+        self.assertEqual(response['X-Sendfile'], self.recipe.image.path)
+        self.assertEqual(response.content, b'')
+
+    def test_legacy_file(self):
+        # Файл, сохраненный до перехода на хранилище с адресацией по содержимому, может быть заменен
+        with open(f'{self.media_root}/avatar.jpg', 'wb') as file:
+            file.write(b'avatar')
+        response = self.client.get('/media/avatar.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+    def test_unprocessed_upload_is_private(self):
+        url = self.recipe.image.url
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], PRIVATE_CACHE_CONTROL)
+
+    def test_published_image_with_job_is_public(self):
+        self.process_images()
+        url = self.recipe.image.url
+        # Задание для опубликованного изображения (например, из миграции) не закрывает к нему доступ
+        ImageJob.objects.create(recipe=self.recipe, source=self.recipe.image.name)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(image_status=ImageStatus.FAILED)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_not_found(self):
+        for url in ('/media/missing.jpg', '/media/../manage.py', '/media/%2e%2e/manage.py',
+                    '/media/.hidden', '/media/content/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from ..cache import RECIPE_LOCK_KEY
+from ..models import Category, Recipe
+from ..object_cache import LocalCache, get_recipe, local_recipes, recipe_key
+
+
+class LocalCacheTest(TestCase):
+    """
+    Тестирование кэша в памяти процесса
+    """
+
+    def test_least_recently_used_evicted(self):
+        local = LocalCache(2)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+        self.assertEqual(local.get('a'), 1)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('c'), 3)
+
+
+class RecipeObjectCacheTest(TestCase):
+    """
+    Тестирование двухуровневого кэша рецептов
+    """
+
+    def setUp(self):
+        cache.clear()
+        local_recipes.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.recipe = Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='recipes_media/test.jpg',
+            author=self.user,
+        )
+
+    def test_recipe_cached(self):
+        with self.assertNumQueries(1):
+            recipe = get_recipe(self.recipe.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(get_recipe(self.recipe.pk), recipe)
+            self.assertEqual(recipe.author.profile.user_id, self.user.pk)
+
+        # Второй процесс находит рецепт в общем кэше
+        local_recipes.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_recipe(self.recipe.pk).title, 'Test Recipe')
+
+    def test_missing_recipe_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_recipe(0))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_recipe(0))
+
+    def test_invalidated_on_save_and_delete(self):
+        get_recipe(self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.title = 'Updated Recipe'
+            self.recipe.save()
+        self.assertEqual(get_recipe(self.recipe.pk).title, 'Updated Recipe')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=self.recipe.pk).delete()
+        self.assertIsNone(get_recipe(self.recipe.pk))
+
+    def test_invalidated_on_author_change(self):
+        get_recipe(self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+        self.assertEqual(get_recipe(self.recipe.pk).author.username, 'renamed')
+
+    def test_other_authors_kept_on_author_change(self):
+        other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        other_recipe = Recipe.objects.create(
+            title='Other Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='recipes_media/test.jpg',
+            author=other_user,
+        )
+        recipe = get_recipe(other_recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+        # Рецепты других авторов остаются в кэше процесса
+        with self.assertNumQueries(0):
+            self.assertIs(get_recipe(other_recipe.pk), recipe)
+
+    def test_single_flight_in_process(self):
+        calls = []
+
+        def load_recipe(pk):
+            calls.append(pk)
+            time.sleep(0.1)
+            return self.recipe
+
+        results = []
+        with mock.patch('webapp.object_cache.load_recipe', load_recipe):
+            threads = [threading.Thread(target=lambda: results.append(get_recipe(self.recipe.pk)))
+                       for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(calls, [self.recipe.pk])
+        self.assertEqual(len(results), 10)
+
+    def test_waits_for_other_process(self):
+        # Блокировку получил другой процесс, который сохранит рецепт в общий кэш
+        key = recipe_key(self.recipe.pk)
+        cache.add(RECIPE_LOCK_KEY.format(id=self.recipe.pk), 1)
+        timer = threading.Timer(0.1, cache.set, args=(key, self.recipe))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_recipe(self.recipe.pk).pk, self.recipe.pk)
@@ -0,0 +1,189 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.views.generic import TemplateView
+from ..cache import get_categories
+from ..models import Category, Recipe
+from ..page_cache import PageCacheMixin
+
+
+class PageCacheTest(TestCase):
+    """
+    Тестирование кэширования страниц для анонимных пользователей и выборочного сброса кэша
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.other_category = Category.objects.create(name='Other Category')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(
+                title='Test Recipe',
+                category=self.category,
+                description='Test description',
+                ingredients='Test ingredients',
+                cooking_steps='Test cooking steps',
+                cooking_time=timedelta(minutes=30),
+                image='recipes_media/test.jpg',
+                author=self.user,
+            )
+        get_categories()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_cached(self, url):
+        # Страница из кэша отдается без запросов к БД
+        with self.assertNumQueries(0):
+            self.get(url)
+
+    def save_recipe(self, **fields):
+        for field, value in fields.items():
+            setattr(self.recipe, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+
+    def test_anonymous_page_is_cached(self):
+        url = reverse('recipes-by-category', args=[self.category.id])
+        self.get(url)
+        self.assert_cached(url)
+
+    def test_unused_query_params_share_page(self):
+        home = reverse('webapp-home')
+        self.get(home)
+        self.assert_cached(f'{home}?utm_source=mail&x=1')
+        # Курсор страницы - часть ключа
+        url = f'{home}?after=invalid'
+        with self.assertNumQueries(1):
+            self.get(url)
+        self.assert_cached(f'{url}&utm_source=mail')
+
+    def test_recipe_change_invalidates_its_pages(self):
+        home = reverse('webapp-home')
+        detail = reverse('recipe-detail', args=[self.recipe.pk])
+        category = reverse('recipes-by-category', args=[self.category.id])
+        other_category = reverse('recipes-by-category', args=[self.other_category.id])
+        author = reverse('user-recipes', args=[self.user.username])
+        for url in (home, detail, category, other_category, author):
+            self.get(url)
+
+        self.save_recipe(title='Updated Recipe')
+        for url in (home, detail, category, author):
+            self.assertContains(self.get(url), 'Updated Recipe')
+        # Страница другой категории не сбрасывается
+        self.assert_cached(other_category)
+
+    def test_category_change_invalidates_old_category(self):
+        category = reverse('recipes-by-category', args=[self.category.id])
+        other_category = reverse('recipes-by-category', args=[self.other_category.id])
+        self.get(category)
+        self.get(other_category)
+
+        self.save_recipe(category=self.other_category)
+        self.assertNotContains(self.get(category), 'Test Recipe')
+        self.assertContains(self.get(other_category), 'Test Recipe')
+
+    def test_author_change_invalidates_author_pages(self):
+        home = reverse('webapp-home')
+        detail = reverse('recipe-detail', args=[self.recipe.pk])
+        category = reverse('recipes-by-category', args=[self.category.id])
+        other_category = reverse('recipes-by-category', args=[self.other_category.id])
+        author = reverse('user-recipes', args=[self.user.username])
+        for url in (home, detail, category, other_category, author):
+            self.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+        for url in (home, detail, category):
+            self.assertContains(self.get(url), 'renamed')
+        # Прежняя страница автора больше не отдается из кэша
+        self.assertNotEqual(self.client.get(author).status_code, 200)
+        self.assert_cached(other_category)
+
+    def test_author_of_inactive_recipes_invalidates_pages(self):
+        # Лента и страница рецепта показывают и неопубликованные рецепты
+        self.save_recipe(active=False)
+        home = reverse('webapp-home')
+        detail = reverse('recipe-detail', args=[self.recipe.pk])
+        for url in (home, detail):
+            self.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+        for url in (home, detail):
+            self.assertContains(self.get(url), 'renamed')
+
+    def test_unchanged_author_keeps_pages(self):
+        home = reverse('webapp-home')
+        self.get(home)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Test'
+            self.user.save()
+            self.user.profile.save()
+        self.assert_cached(home)
+
+    def test_author_without_recipes_keeps_pages(self):
+        home = reverse('webapp-home')
+        self.get(home)
+        other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        with self.captureOnCommitCallbacks(execute=True):
+            other_user.profile.image = 'users_media/profile_pics/new.jpg'
+            other_user.profile.save()
+        self.assert_cached(home)
+
+    def test_page_is_shared_by_users(self):
+        url = reverse('recipes-by-category', args=[self.category.id])
+        self.get(url)
+        self.client.login(username='testuser', password='testpassword')
+        self.assert_cached(url)
+
+    def test_page_is_not_personalized(self):
+        self.client.login(username='testuser', password='testpassword')
+        response = self.get(reverse('recipe-detail', args=[self.recipe.pk]))
+        self.assertNotContains(response, 'Мои рецепты')
+        # Кнопки автора скрыты и показываются скриптом только автору
+        self.assertContains(response, 'class="d-none" data-author="testuser"')
+
+    def test_page_tags_required(self):
+        class View(PageCacheMixin, TemplateView):
+            template_name = 'webapp/about.html'
+
+        with self.assertRaises(ImproperlyConfigured):
+            View.as_view()
+
+
+class SessionViewTest(TestCase):
+    """
+    Тестирование загрузки персональной части страниц
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+
+    def test_anonymous(self):
+        response = self.client.get(reverse('session'))
+        self.assertIn('no-store', response['Cache-Control'])
+        session = response.json()
+        self.assertIsNone(session['username'])
+        self.assertIn(reverse('login'), session['nav'])
+
+    def test_authenticated_with_messages(self):
+        self.client.login(username='testuser', password='testpassword')
+        # Сообщение добавляется при обновлении профиля и показывается после перенаправления
+        self.client.post(reverse('profile'), {'username': 'testuser', 'email': 'test@example.com'})
+        session = self.client.get(reverse('session')).json()
+        self.assertEqual(session['username'], 'testuser')
+        self.assertIn(reverse('user-recipes', args=['testuser']), session['nav'])
+        self.assertIn('alert', session['messages'])
+
+        # Сообщение показывается один раз
+        session = self.client.get(reverse('session')).json()
+        self.assertEqual(session['messages'].strip(), '')
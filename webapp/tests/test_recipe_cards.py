@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from ..cache import recipe_card_key
+from ..models import Category, Recipe
+
+
+class RecipeCardCacheTest(TestCase):
+    """
+    Тестирование кэширования карточек рецептов в списках
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.recipe = Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='recipes_media/test.jpg',
+            author=self.user,
+        )
+        # Страницы авторизованных пользователей целиком не кэшируются, кэшируются только карточки
+        self.client.login(username='testuser', password='testpassword')
+
+    def card_key(self, loading='eager'):
+        return recipe_card_key(Recipe.objects.cards().get(pk=self.recipe.pk), loading)
+
+    def test_card_is_shared_by_list_pages(self):
+        response = self.client.get(reverse('webapp-home'))
+        self.assertContains(response, 'Test Recipe')
+        card = cache.get(self.card_key())
+        self.assertIn('Test Recipe', card)
+
+        # Закэшированная карточка используется на других страницах
+        cache.set(self.card_key(), card.replace('Test Recipe', 'Cached Recipe'))
+        for url in (reverse('recipes-by-category', args=[self.category.id]),
+                    reverse('user-recipes', args=[self.user.username])):
+            self.assertContains(self.client.get(url), 'Cached Recipe')
+
+    def test_first_card_is_loaded_eagerly(self):
+        Recipe.objects.create(
+            title='Second Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='recipes_media/second.jpg',
+            author=self.user,
+        )
+        content = self.client.get(reverse('webapp-home')).content.decode()
+        self.assertEqual(content.count('loading="eager"'), 1)
+        self.assertEqual(content.count('loading="lazy"'), 1)
+
+    def test_recipe_change_changes_card_key(self):
+        key = self.card_key()
+        self.recipe.title = 'Updated Recipe'
+        self.recipe.save()
+        self.assertNotEqual(self.card_key(), key)
+        self.assertContains(self.client.get(reverse('webapp-home')), 'Updated Recipe')
+
+    def test_author_change_changes_card_key(self):
+        key = self.card_key()
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertNotEqual(self.card_key(), key)
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from ..models import Category, Recipe
+from ..search import search_recipes, fuzzy_search_recipes
+
+
+class SearchTestCase(TestCase):
+    """
+    Общие тестовые данные для тестов поиска рецептов
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.soup = self.create_recipe('Борщ', 'Красный суп', 'свекла, капуста, картофель')
+        self.salad = self.create_recipe('Винегрет', 'Салат со свеклой', 'свекла, огурцы, горошек')
+        self.pie = self.create_recipe('Пирог', 'Пирог с яблоками', 'мука, яйца, яблоки')
+
+    def create_recipe(self, title, description, ingredients):
+        return Recipe.objects.create(
+            title=title,
+            category=self.category,
+            description=description,
+            ingredients=ingredients,
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='path/to/test/image.jpg',
+            author=self.user,
+        )
+
+
+class RecipeSearchTest(SearchTestCase):
+    """
+    Тестирование поиска рецептов (на SQLite используется упрощенный поиск по подстроке)
+    """
+
+    def test_search_by_ingredient(self):
+        results = list(search_recipes('свекла'))
+        self.assertEqual(set(results), {self.soup, self.salad})
+
+    def test_title_match_ranked_first(self):
+        # Совпадение в заголовке выше совпадения только в описании
+        newer = self.create_recipe('Шарлотка', 'Пирог без дрожжей', 'мука, яйца, яблоки')
+        results = list(search_recipes('Пирог'))
+        self.assertEqual(results, [self.pie, newer])
+        results = list(search_recipes('суп'))
+        self.assertEqual(results, [self.soup])
+
+    def test_all_terms_required(self):
+        self.assertEqual(list(search_recipes('свекла огурцы')), [self.salad])
+
+    def test_empty_query(self):
+        self.assertEqual(list(search_recipes('  ')), [])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('recipe-search'), {'q': 'свекла'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Борщ')
+        self.assertContains(response, 'Винегрет')
+        self.assertNotContains(response, 'Пирог')
+
+
+class FuzzySearchTest(SearchTestCase):
+    """
+    Тестирование нечеткого поиска рецептов (на SQLite используется индекс rapidfuzz в памяти)
+    """
+
+    def test_title_with_typo(self):
+        results = fuzzy_search_recipes('винигрет')
+        self.assertEqual(results[0], self.salad)
+        self.assertGreater(results[0].similarity, 0.7)
+
+    def test_ingredient_match(self):
+        results = fuzzy_search_recipes('яблоки', field='ingredients')
+        self.assertEqual(results, [self.pie])
+
+    def test_index_updated_on_save(self):
+        fuzzy_search_recipes('винегрет')
+        soup = self.create_recipe('Солянка', 'Суп', 'мясо, огурцы')
+        self.assertEqual(fuzzy_search_recipes('соляника')[0], soup)
+
+    def test_no_match(self):
+        self.assertEqual(fuzzy_search_recipes('zzzz'), [])
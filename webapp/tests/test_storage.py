@@ -0,0 +1,48 @@
+import os
+from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from ..models import MediaFile
+from ..storage import hash_from_name
+from .utils import TemporaryMediaMixin
+
+
+class ContentAddressedStorageTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование хранилища медиафайлов с адресацией по содержимому
+    """
+
+    def setUp(self):
+        super().setUp()
+
+    def test_name_is_content_hash(self):
+        name = default_storage.save('users_media/upload/photo.JPG', ContentFile(b'content'))
+        digest = hash_from_name(name)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(name, f'content/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), b'content')
+
+    def test_identical_files_are_stored_once(self):
+        first = default_storage.save('a.jpg', ContentFile(b'content'))
+        second = default_storage.save('b.jpg', ContentFile(b'content'))
+        other = default_storage.save('c.jpg', ContentFile(b'other content'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(MediaFile.objects.get(name=first).references, 2)
+
+        # Файл удаляется с диска только после удаления последней ссылки
+        default_storage.delete(first)
+        self.assertTrue(default_storage.exists(first))
+        default_storage.delete(second)
+        self.assertFalse(default_storage.exists(first))
+        self.assertFalse(MediaFile.objects.filter(name=first).exists())
+
+    def test_untracked_file_is_deleted(self):
+        # Файлы, сохраненные до перехода на хранилище, удаляются как раньше
+        name = 'users_media/upload/old.jpg'
+        os.makedirs(os.path.dirname(default_storage.path(name)))
+        with open(default_storage.path(name), 'wb') as file:
+            file.write(b'old')
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from usersapp.models import Profile
+from ..models import Category, Recipe
+
+
+class ChangeTrackingTest(TestCase):
+    """
+    Тестирование отслеживания изменений полей моделей Recipe и Profile
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        recipe = Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image='path/to/test/image.jpg',
+            author=self.user,
+        )
+        self.recipe = Recipe.objects.get(pk=recipe.pk)
+
+    def test_has_changed(self):
+        self.assertFalse(self.recipe.has_changed('title'))
+        self.assertEqual(self.recipe.get_changed_fields(), [])
+
+        self.recipe.title = 'New title'
+        self.assertTrue(self.recipe.has_changed('title'))
+        self.assertFalse(self.recipe.has_changed('image'))
+        self.assertEqual(self.recipe.get_changed_fields(), ['title'])
+        self.assertEqual(self.recipe.get_loaded_value('title'), 'Test Recipe')
+
+    def test_save_writes_changed_fields(self):
+        updated_date = self.recipe.updated_date
+        self.recipe.title = 'New title'
+        with CaptureQueriesContext(connection) as queries:
+            self.recipe.save()
+
+        # Один UPDATE без повторного чтения рецепта, только измененные поля и дата изменения
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        self.assertIn('"title"', sql)
+        self.assertIn('"updated_date"', sql)
+        self.assertNotIn('"description"', sql)
+
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.title, 'New title')
+        self.assertGreater(recipe.updated_date, updated_date)
+        self.assertFalse(self.recipe.has_changed('title'))
+
+    def test_save_without_changes(self):
+        with self.assertNumQueries(0):
+            self.recipe.save()
+
+    def test_image_change(self):
+        self.recipe.image = 'path/to/new/image.jpg'
+        self.recipe.save()
+
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.image.name, 'path/to/new/image.jpg')
+        self.assertEqual(recipe.image_jobs.filter(source='path/to/new/image.jpg').count(), 1)
+
+    def test_update_view_does_not_reload_recipe(self):
+        self.client.login(username='testuser', password='testpassword')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('recipe-update', args=[self.recipe.id]), {
+                'title': 'New title',
+                'category': self.category.id,
+                'description': 'Test description',
+                'ingredients': 'Test ingredients',
+                'cooking_steps': 'Test cooking steps',
+                'cooking_time': '00:30:00',
+                'active': True,
+            })
+        recipe_selects = [query['sql'] for query in queries
+                          if query['sql'].startswith('SELECT') and 'FROM "webapp_recipe"' in query['sql']]
+        # Рецепт загружается для проверки автора и для формы, но не перед сохранением
+        self.assertEqual(len(recipe_selects), 2)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).title, 'NEW TITLE')
+
+    def test_profile_save_without_changes(self):
+        profile = Profile.objects.get(user=self.user)
+        with self.assertNumQueries(0):
+            profile.save()
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+from PIL import Image
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from ..forms import RecipeForm
+from ..models import Category, ImageJob, Recipe
+from ..uploads import draft_image, probe_image
+from .test_images import make_image
+from .utils import TemporaryMediaMixin
+
+
+class ImageUploadTest(TemporaryMediaMixin, TestCase):
+    """
+    Тестирование проверки загружаемых изображений до декодирования и уменьшенного декодирования JPEG
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+
+    def make_form(self, image):
+        form_data = {
+            'title': 'Test Recipe',
+            'category': self.category.id,
+            'description': 'Test description',
+            'ingredients': 'Test ingredients',
+            'cooking_steps': 'Test cooking steps',
+            'cooking_time': '01:00:00',
+            'active': True,
+        }
+        return RecipeForm(data=form_data, files={'image': image})
+
+    def test_probe_image(self):
+        image = make_image(1600, 1200)
+        self.assertEqual(probe_image(image), ('JPEG', (1600, 1200)))
+        self.assertEqual(image.tell(), 0)
+
+    def test_valid_upload(self):
+        self.assertTrue(self.make_form(make_image()).is_valid())
+
+    @override_settings(MAX_IMAGE_PIXELS=1000000)
+    def test_too_many_pixels(self):
+        form = self.make_form(make_image(1600, 1200))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code, 'image_too_large')
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=100)
+    def test_file_too_large(self):
+        form = self.make_form(make_image())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code, 'file_too_large')
+
+    def test_jpeg_draft(self):
+        buffer = BytesIO()
+        Image.new('RGB', (2048, 1536), 'red').save(buffer, 'JPEG')
+        with Image.open(buffer) as image:
+            draft_image(image, 1024, 768)
+            image.load()
+            self.assertEqual(image.size, (1024, 768))
+
+        # Масштаб выбирается так, чтобы изображение не стало меньше нужного размера
+        with Image.open(buffer) as image:
+            draft_image(image, 1100, 800)
+            image.load()
+            self.assertEqual(image.size, (2048, 1536))
+
+    @override_settings(MAX_IMAGE_PIXELS=1000000)
+    def test_worker_rejects_too_many_pixels(self):
+        # Изображение сохранено без проверки формы (например, через API)
+        recipe = Recipe.objects.create(
+            title='Test Recipe',
+            category=self.category,
+            description='Test description',
+            ingredients='Test ingredients',
+            cooking_steps='Test cooking steps',
+            cooking_time=timedelta(minutes=30),
+            image=make_image(1600, 1200),
+            author=self.user,
+        )
+        call_command('process_images', once=True, workers=1, stdout=StringIO())
+        job = ImageJob.objects.get(recipe=recipe)
+        self.assertIn('too large', job.error)
@@ -1,6 +1,13 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
+from django.views.generic import TemplateView
+from ..cache import get_categories
+from ..conditional import ConditionalGetMixin
 from ..models import Recipe, Category
 
 
@@ -86,3 +93,230 @@ class RecipeViewsTest(TestCase):
         response = self.client.get(reverse('webapp-about'))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'О клубе любителей готовить')
+
+
+class RecipeListQueryCountTest(TestCase):
+    """
+    Количество запросов к БД на страницах со списками рецептов не зависит от числа карточек
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+
+    def create_recipes(self, count):
+        # Закэшированные страницы сбрасываются после завершения транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_recipes(count)
+
+    def _create_recipes(self, count):
+        for i in range(count):
+            Recipe.objects.create(
+                title=f'Test Recipe {i}',
+                category=self.category,
+                description='Test description',
+                ingredients='Test ingredients',
+                cooking_steps='Test cooking steps',
+                cooking_time=timedelta(minutes=30),
+                image='path/to/test/image.jpg',
+                author=self.user,
+            )
+
+    def assert_constant_queries(self, url, num):
+        # Первый запрос заполняет кэш меню категорий
+        self.client.get(url)
+        for count in (1, 5):
+            self.create_recipes(count)
+            # Новые рецепты меняют счетчики в меню категорий, меню загружается заново
+            get_categories()
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_list_view_queries(self):
+        self.assert_constant_queries(reverse('webapp-home'), 1)
+
+    def test_user_recipe_list_view_queries(self):
+        # Пользователь со статистикой автора и рецепты, количество рецептов - из счетчика
+        self.assert_constant_queries(reverse('user-recipes', args=['testuser']), 2)
+
+    def test_recipe_by_category_view_queries(self):
+        self.assert_constant_queries(reverse('recipes-by-category', args=[self.category.id]), 2)
+
+    def test_recipe_detail_view_queries(self):
+        self.create_recipes(1)
+        recipe = Recipe.objects.get()
+        get_categories()
+        # Один запрос рецепта: он же используется для условного GET
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+        self.assertEqual(response.status_code, 200)
+        # Повторно и рецепт, и страница отдаются из кэша
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('recipe-detail', args=[recipe.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_cards_defer_large_fields(self):
+        self.create_recipes(1)
+        recipe = Recipe.objects.cards().get()
+        self.assertEqual(recipe.get_deferred_fields(), {'ingredients', 'cooking_steps', 'search_vector'})
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Постраничный вывод ленты рецептов по курсору
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        now = timezone.now()
+        # Два рецепта с одинаковой датой создания, чтобы проверить сортировку по id
+        dates = [now - timedelta(hours=i) for i in range(6)] + [now - timedelta(hours=5)]
+        self.recipes = [
+            Recipe.objects.create(
+                title=f'Test Recipe {i}',
+                category=self.category,
+                description='Test description',
+                ingredients='Test ingredients',
+                cooking_steps='Test cooking steps',
+                cooking_time=timedelta(minutes=30),
+                image='path/to/test/image.jpg',
+                author=self.user,
+                created_date=date,
+            )
+            for i, date in enumerate(dates)
+        ]
+
+    def test_pages_follow_each_other(self):
+        first = self.client.get(reverse('webapp-home'))
+        self.assertEqual(len(first.context['recipes']), 5)
+        self.assertTrue(first.context['page_obj'].has_next())
+        self.assertFalse(first.context['page_obj'].has_previous())
+
+        second = self.client.get(reverse('webapp-home'), {'after': first.context['page_obj'].next_cursor})
+        self.assertEqual(len(second.context['recipes']), 2)
+        self.assertFalse(second.context['page_obj'].has_next())
+        self.assertTrue(second.context['page_obj'].has_previous())
+
+        # Рецепты на страницах не повторяются и идут от новых к старым
+        ids = [r.id for r in first.context['recipes']] + [r.id for r in second.context['recipes']]
+        expected = Recipe.objects.order_by('-created_date', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+        back = self.client.get(reverse('webapp-home'), {'before': second.context['page_obj'].previous_cursor})
+        self.assertEqual(list(back.context['recipes']), list(first.context['recipes']))
+
+    def test_user_recipes_count(self):
+        response = self.client.get(reverse('user-recipes', args=['testuser']))
+        self.assertEqual(response.context['recipes_count'], 7)
+        self.assertContains(response, 'Опубликовано: 7')
+
+    def test_recipes_by_category_paginated(self):
+        response = self.client.get(reverse('recipes-by-category', args=[self.category.id]))
+        self.assertEqual(len(response.context['recipes']), 5)
+        self.assertEqual(response.context['category'], self.category)
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor(self):
+        # Некорректный курсор приводит к выводу первой страницы
+        response = self.client.get(reverse('webapp-home'), {'after': 'invalid'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Условные GET-запросы (ETag / Last-Modified) для страниц с рецептами
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(name='Test Category')
+        self.recipe = self.create_recipe()
+
+    def create_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                title='Test Recipe',
+                category=self.category,
+                description='Test description',
+                ingredients='Test ingredients',
+                cooking_steps='Test cooking steps',
+                cooking_time=timedelta(minutes=30),
+                image='path/to/test/image.jpg',
+                author=self.user,
+            )
+
+    def test_recipe_detail_not_modified(self):
+        url = reverse('recipe-detail', args=[self.recipe.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Дата изменения рецепта для повторного запроса берется из кэша
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_detail_modified_after_save(self):
+        url = reverse('recipe-detail', args=[self.recipe.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.description = 'Updated description'
+            self.recipe.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Updated description')
+
+    def test_recipe_list_not_modified(self):
+        url = reverse('webapp-home')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Новый рецепт меняет версию списков
+        self.create_recipe()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_does_not_depend_on_user(self):
+        # Персональная часть страницы загружается отдельно, страница одинакова для всех пользователей
+        url = reverse('webapp-home')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.client.login(username='testuser', password='testpassword')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_author_change(self):
+        # Имя и аватарка автора показываются и в списках, и на странице рецепта
+        urls = [reverse('webapp-home'), reverse('recipe-detail', args=[self.recipe.id])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'renamed')
+
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.image = 'users_media/profile_pics/new.jpg'
+            self.user.profile.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'users_media/profile_pics/new.jpg')
+
+    def test_etag_required(self):
+        class View(ConditionalGetMixin, TemplateView):
+            template_name = 'webapp/about.html'
+
+        with self.assertRaises(ImproperlyConfigured):
+            View.as_view()
@@ -0,0 +1,18 @@
+import shutil
+import tempfile
+from django.test import override_settings
+
+
+class TemporaryMediaMixin:
+    """
+    Медиакаталог теста во временной папке (self.media_root): файлы, записанные тестом,
+    удаляются после него
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
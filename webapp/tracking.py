@@ -0,0 +1,76 @@
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTrackingMixin:
+    """
+    Отслеживание изменений полей модели. Значения полей запоминаются при загрузке объекта
+    из БД (from_db) и после сохранения, поэтому для проверки изменений не нужен повторный
+    запрос, а save() записывает только измененные поля (update_fields)
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            attname: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for attname, value in zip(field_names, values)
+        }
+        return instance
+
+    def _current_value(self, field):
+        return field.get_prep_value(field.value_from_object(self))
+
+    def _take_snapshot(self, fields=None):
+        loaded_values = getattr(self, '_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.attname in fields
+                                                   or field.name in fields):
+                value = self._current_value(field)
+                loaded_values[field.attname] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        self._loaded_values = loaded_values
+
+    def get_loaded_value(self, field_name):
+        """
+        Значение поля на момент загрузки объекта из БД или последнего сохранения. Для объектов,
+        созданных не из БД, и отложенных полей (defer) значение читается запросом
+        """
+        field = self._meta.get_field(field_name)
+        loaded_values = getattr(self, '_loaded_values', {})
+        if field.attname in loaded_values:
+            return loaded_values[field.attname]
+        if self._state.adding or self.pk is None:
+            return None
+        return type(self)._base_manager.filter(pk=self.pk).values_list(field.attname, flat=True).first()
+
+    def has_changed(self, field_name):
+        field = self._meta.get_field(field_name)
+        if self._state.adding:
+            return True
+        if field.attname not in self.__dict__:
+            # Отложенное поле не загружалось и не изменялось
+            return False
+        return self._current_value(field) != self.get_loaded_value(field_name)
+
+    def get_changed_fields(self):
+        return [field.name for field in self._meta.concrete_fields
+                if not field.primary_key and self.has_changed(field.name)]
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and hasattr(self, '_loaded_values') and not args
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            changed = self.get_changed_fields()
+            if changed:
+                # Поля с auto_now обновляются при каждом сохранении измененного объекта
+                changed += [field.name for field in self._meta.concrete_fields
+                            if getattr(field, 'auto_now', False) and field.name not in changed]
+            # Пустой список update_fields - сохранение без запроса к БД
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+        self._take_snapshot(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._take_snapshot(fields)
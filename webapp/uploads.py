@@ -0,0 +1,69 @@
+import math
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Загрузка изображений с ограниченным расходом памяти: файлы принимаются во временный файл
+на диске (FILE_UPLOAD_HANDLERS), размеры изображения проверяются по заголовку до декодирования,
+а JPEG декодируется сразу в уменьшенном масштабе (draft), если нужна только уменьшенная копия
+"""
+
+# Тег EXIF Orientation: значения 5-8 означают поворот изображения на 90 градусов
+EXIF_ORIENTATION = 0x0112
+
+
+def image_too_large(width, height):
+    return width * height > settings.MAX_IMAGE_PIXELS
+
+
+def probe_image(file):
+    """
+    Формат и размеры изображения по заголовку файла, без декодирования пикселей
+    """
+    source = file.temporary_file_path() if hasattr(file, 'temporary_file_path') else file
+    try:
+        with Image.open(source) as image:
+            return image.format, image.size
+    finally:
+        file.seek(0)
+
+
+def validate_image_upload(value):
+    """
+    Проверка нового изображения до его обработки: размер файла и количество пикселей.
+    Уже сохраненные файлы не проверяются
+    """
+    if getattr(value, '_committed', True):
+        return
+    if value.size > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise ValidationError('Размер файла не должен превышать %(size)s МБ', code='file_too_large',
+                              params={'size': settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)})
+    try:
+        _, (width, height) = probe_image(value.file)
+    except Exception as e:
+        logger.error(f"An error occurred while probing uploaded image: {str(e)}")
+        raise ValidationError('Загрузите корректное изображение', code='invalid_image')
+    if image_too_large(width, height):
+        raise ValidationError('Изображение слишком большое (%(width)s x %(height)s), допустимо не более '
+                              '%(megapixels)s Мп', code='image_too_large',
+                              params={'width': width, 'height': height,
+                                      'megapixels': settings.MAX_IMAGE_PIXELS // 1000000})
+
+
+def draft_image(image, width, height):
+    """
+    Декодирование JPEG в уменьшенном масштабе (1/2, 1/4 или 1/8), но не меньше размера,
+    нужного для вписывания изображения в width x height с учетом поворота по EXIF.
+    Вызывается до загрузки пикселей (load), для других форматов ничего не делает
+    """
+    if image.format != 'JPEG':
+        return
+    if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        width, height = height, width
+    scale = min(width / image.width, height / image.height)
+    if scale < 1:
+        image.draft(image.mode, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
@@ -4,8 +4,8 @@ from django.conf import settings
 from .views import (
     RecipeListView, UserRecipeListView, RecipeDetailView,
     RecipeCreateView, RecipeUpdateView, RecipeDeleteView,
-    RecipeByCategoryView, AboutView, Error403View, Error404View,
-    Error500View
+    RecipeByCategoryView, RecipeSearchView, AboutView, Error403View, Error404View,
+    Error500View, SessionView
 )
 
 urlpatterns = [
@@ -19,10 +19,11 @@ urlpatterns = [
     path('recipe/<int:pk>/update/', RecipeUpdateView.as_view(), name='recipe-update'),
     path('recipe/<int:pk>/delete/', RecipeDeleteView.as_view(), name='recipe-delete'),
     path('recipes/category/<int:category_id>/', RecipeByCategoryView.as_view(), name='recipes-by-category'),
+    path('search/', RecipeSearchView.as_view(), name='recipe-search'),
     path('about/', AboutView.as_view(), name='webapp-about'),
+    path('session/', SessionView.as_view(), name='session'),
 ]
 
-# включаем возможность обработки изображений и статики в режиме DEBUG
+# включаем возможность обработки статики в режиме DEBUG (медиафайлы отдает MediaView)
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -5,40 +5,46 @@ from django.views.generic import (
     TemplateView, ListView, DetailView,
     CreateView, UpdateView, DeleteView
 )
-from .models import Recipe, Category
+from .models import AuthorStats, Recipe, Category
 from .forms import RecipeForm
+from .pagination import KeysetPaginationMixin
+from .conditional import RecipeListConditionalMixin, RecipeDetailConditionalMixin
+from .page_cache import PageCacheMixin
+from .object_cache import get_recipe
+from .search import search_recipes
+from .ingredients import sync_recipe_ingredients
+from .media import media_name, can_access_media, media_response
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.views import View
+from django.conf import settings
+from django.http import Http404, HttpResponseForbidden, HttpResponseNotFound, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import add_never_cache_headers
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class RecipeListView(ListView):
+class RecipeListView(RecipeListConditionalMixin, PageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Отображает список объектов модели Recipe
     """
     model = Recipe
+    queryset = Recipe.objects.cards()
     template_name = 'webapp/home.html'
     context_object_name = 'recipes'
     # Сортировка объектов по дате публикации в убывающем порядке
-    ordering = ['-created_date']
-    # Пагинация постов с рецептами
+    ordering = ['-created_date', '-id']
+    # Пагинация постов с рецептами (по курсору)
     paginate_by = 5
 
-    def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in RecipeListView: {str(e)}")
-            raise
+    def get_page_tags(self):
+        return ['feed']
 
 
-class UserRecipeListView(ListView):
+class UserRecipeListView(RecipeListConditionalMixin, PageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Отображает список объектов модели Recipe конкретного пользователя
     """
@@ -47,70 +53,112 @@ class UserRecipeListView(ListView):
     context_object_name = 'recipes'
     paginate_by = 5
 
+    def get_page_tags(self):
+        return [f"author:{self.kwargs.get('username')}"]
+
     def get_queryset(self):
         try:
-            user = get_object_or_404(User, username=self.kwargs.get('username'))
-            return Recipe.objects.filter(author=user).order_by('-created_date')
+            # Статистика автора загружается вместе с пользователем одним запросом
+            self.author = get_object_or_404(User.objects.select_related('recipe_stats'),
+                                             username=self.kwargs.get('username'))
+            # Показываются опубликованные рецепты, как и в счетчике в заголовке страницы
+            return (Recipe.objects.cards().filter(author=self.author, active=True)
+                    .order_by('-created_date', '-id'))
         except Exception as e:
             logger.error(f"An error occurred in UserRecipeListView: {str(e)}")
             raise
 
     def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
+        # Количество опубликованных рецептов пользователя для заголовка страницы (счетчик
+        # обновляется вместе с рецептами, webapp/counters.py)
         try:
             context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
+            try:
+                context['recipes_count'] = self.author.recipe_stats.recipes_count
+            except AuthorStats.DoesNotExist:
+                context['recipes_count'] = 0
             return context
         except Exception as e:
             logger.error(f"An error occurred in UserRecipeListView: {str(e)}")
             raise
 
 
-class RecipeByCategoryView(ListView):
+class RecipeByCategoryView(RecipeListConditionalMixin, PageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Отображает список объектов модели Recipe по ключу выбранной модели Category
     """
     model = Recipe
     template_name = 'webapp/recipes_by_category.html'
     context_object_name = 'recipes'
+    paginate_by = 5
+
+    def get_page_tags(self):
+        return [f"category:{self.kwargs['category_id']}"]
 
     def get_queryset(self):
         try:
-            category = get_object_or_404(Category, id=self.kwargs['category_id'])
-            return Recipe.objects.filter(category=category)
+            # Категория запрашивается один раз и используется также в контексте шаблона
+            self.category = get_object_or_404(Category, id=self.kwargs['category_id'])
+            return Recipe.objects.cards().filter(category=self.category).order_by('-created_date', '-id')
         except Exception as e:
             logger.error(f"An error occurred in RecipeByCategoryView: {str(e)}")
             raise
 
     def get_context_data(self, **kwargs):
-        # Добавлен обработчик переменной 'categories' для меню категорий рецептов
         try:
             context = super().get_context_data(**kwargs)
-            context['category'] = get_object_or_404(Category, id=self.kwargs['category_id'])
-            context['categories'] = Category.objects.all()
+            context['category'] = self.category
             return context
         except Exception as e:
             logger.error(f"An error occurred in RecipeByCategoryView: {str(e)}")
             raise
 
 
-class RecipeDetailView(DetailView):
+class RecipeSearchView(ListView):
     """
-    Отображение подробной информации о конкретном объекте модели Recipe
+    Поиск рецептов по названию, описанию и ингредиентам с ранжированием результатов
     """
     model = Recipe
+    template_name = 'webapp/search_results.html'
+    context_object_name = 'recipes'
+    paginate_by = 5
+
+    def get_queryset(self):
+        try:
+            return search_recipes(self.request.GET.get('q', ''))
+        except Exception as e:
+            logger.error(f"An error occurred in RecipeSearchView: {str(e)}")
+            raise
 
     def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
         try:
             context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
+            context['query'] = self.request.GET.get('q', '')
             return context
         except Exception as e:
-            logger.error(f"An error occurred in RecipeDetailView: {str(e)}")
+            logger.error(f"An error occurred in RecipeSearchView: {str(e)}")
             raise
 
 
+class RecipeDetailView(RecipeDetailConditionalMixin, PageCacheMixin, DetailView):
+    """
+    Отображение подробной информации о конкретном объекте модели Recipe
+    """
+    model = Recipe
+    queryset = Recipe.objects.detailed()
+
+    def get_page_tags(self):
+        return [f"recipe:{self.kwargs['pk']}"]
+
+    def get_object(self, queryset=None):
+        # Рецепт берется из кэша (webapp/object_cache.py), запрос к БД - только при первом
+        # обращении после его изменения
+        recipe = get_recipe(self.kwargs['pk'])
+        if recipe is None:
+            raise Http404('Рецепт не найден')
+        return recipe
+
+
 class RecipeCreateView(LoginRequiredMixin, CreateView):
     """
     Создание новых объектов модели Recipe,
@@ -128,6 +176,7 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
             form.instance.author = self.request.user
             form.instance.title = form.cleaned_data['title'].upper()
             result = super().form_valid(form)
+            sync_recipe_ingredients(self.object)
             messages.success(self.request, f'Рецепт успешно добавлен.')
             return result
         except Exception as e:
@@ -142,16 +191,6 @@ class RecipeCreateView(LoginRequiredMixin, CreateView):
             logger.error(f"An error occurred in RecipeCreateView: {str(e)}")
             raise
 
-    def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in RecipeCreateView: {str(e)}")
-            raise
-
 
 class RecipeUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     """
@@ -168,6 +207,9 @@ class RecipeUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             form.instance.author = self.request.user
             form.instance.title = form.cleaned_data['title'].upper()
             result = super().form_valid(form)
+            # Список ингредиентов обновляется только при изменении их текста
+            if 'ingredients' in form.changed_data:
+                sync_recipe_ingredients(self.object)
             messages.success(self.request, f'Рецепт успешно изменен.')
             return result
         except Exception as e:
@@ -185,16 +227,6 @@ class RecipeUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             logger.error(f"An error occurred in RecipeUpdateView: {str(e)}")
             raise
 
-    def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in RecipeUpdateView: {str(e)}")
-            raise
-
 
 class RecipeDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     """
@@ -224,16 +256,6 @@ class RecipeDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
             messages.error(self.request, f'Произошла ошибка при удалении рецепта.')
             raise
 
-    def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
-        try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
-        except Exception as e:
-            logger.error(f"An error occurred in RecipeDeleteView: {str(e)}")
-            raise
-
 
 class AboutView(TemplateView):
     """
@@ -242,14 +264,45 @@ class AboutView(TemplateView):
     template_name = 'webapp/about.html'
     extra_context = {'title': 'О клубе любителей готовить'}
 
-    def get_context_data(self, **kwargs):
-        # Обработчик переменной 'categories' для меню категорий рецептов
+
+class MediaView(View):
+    """
+    Отдача медиафайлов: проверка пути и прав доступа в Django, передача файла -
+    веб-сервером или потоково (webapp/media.py). Ошибки возвращаются без страницы
+    с оформлением, так как медиафайлы запрашиваются тегами img и source
+    """
+    def get(self, request, path, *args, **kwargs):
         try:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.all()
-            return context
+            name = media_name(path)
+            if name is None or not os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+                return HttpResponseNotFound()
+            allowed, private = can_access_media(request, name)
+            if not allowed:
+                return HttpResponseForbidden()
+            return media_response(request, name, private)
+        except Exception as e:
+            logger.error(f"An error occurred in MediaView: {str(e)}")
+            raise
+
+
+class SessionView(View):
+    """
+    Персональная часть страниц: навигационная панель пользователя и непоказанные сообщения.
+    Страницы сайта не зависят от пользователя и кэшируются, а эти данные запрашиваются
+    скриптом webapp/session.js отдельно и никогда не кэшируются
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            context = {'user': request.user, 'messages': messages.get_messages(request)}
+            response = JsonResponse({
+                'username': request.user.username if request.user.is_authenticated else None,
+                'nav': render_to_string('webapp/includes/user_nav.html', context, request),
+                'messages': render_to_string('webapp/includes/messages.html', context, request),
+            })
+            add_never_cache_headers(response)
+            return response
         except Exception as e:
-            logger.error(f"An error occurred in AboutView: {str(e)}")
+            logger.error(f"An error occurred in SessionView: {str(e)}")
             raise
 
 